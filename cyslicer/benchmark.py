@@ -0,0 +1,256 @@
+## benchmark.py
+# Stage benchmarks on synthetic inputs with a JSON history.
+#
+#   python benchmark.py [--scales small,medium] [--stages modify_gcode,...]
+#                       [--repeat N] [--threshold 0.25] [--history PATH]
+#                       [--machine NAME] [--no-record] [--keep]
+#
+# Each stage runs `repeat` times on inputs from benchmark_data (best time
+# is kept), then once more under tracemalloc for its peak Python/numpy
+# allocation. Results are compared with the median of the last
+# BASELINE_RUNS records from the same machine; the run exits with status 1
+# when a stage is slower or uses more memory than threshold allows. The
+# machine key is --machine, else $CYSLICER_BENCH_MACHINE, else the host
+# name; CI runners with changing host names should set one of the first two.
+# Slicing goes through fake_slicer and rendering is offscreen, so neither
+# PrusaSlicer nor a display is needed. The xlarge scale (10M G-code lines)
+# runs only estimate_print unless --stages asks for more.
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("PYVISTA_OFF_SCREEN", "true")
+
+import numpy as np
+import pyvista as pv
+
+import benchmark_data
+import fake_slicer
+from stl_utils import unwrap_and_repair_stl
+from gcode_utils import modify_gcode, compact_gcode
+from gcode_visualiser import parse_cylindrical_gcode
+from gcode_estimator import estimate_print
+from pipeline import slice_stl_job
+
+SCALES = {
+    "small": {"faces": 2_000, "lines": 20_000},
+    "medium": {"faces": 20_000, "lines": 200_000},
+    "large": {"faces": 100_000, "lines": 1_000_000},
+    # Only the chunked estimator is meant for files this long
+    "xlarge": {"faces": 2_000, "lines": 10_000_000, "stages": ("estimate_print",)},
+}
+DEFAULT_SCALES = ("small", "medium")
+HISTORY_PATH = Path(__file__).parent / "benchmark_history.json"   # per checkout, git-ignored
+CONFIG_PATH = Path(__file__).parent / "config" / "my_config.ini"
+BED_RADIUS = 17.0
+REPEAT = 3
+REGRESSION_THRESHOLD = 0.25    # fraction over the baseline that counts as a regression
+BASELINE_RUNS = 5
+MIN_TIME = 0.005               # s; faster stages are too noisy to judge
+MACHINE_ENV = "CYSLICER_BENCH_MACHINE"
+
+
+def prepare_inputs(scale, work_dir, stages=None):
+    """Generate the meshes and G-code the given stages need for one scale into work_dir."""
+    faces, lines = SCALES[scale]["faces"], SCALES[scale]["lines"]
+    work_dir = Path(work_dir)
+    (work_dir / "stl").mkdir(parents=True, exist_ok=True)
+    inputs = {"dir": work_dir}
+    for name, build in (("ring", benchmark_data.ring_mesh),
+                        ("lattice", benchmark_data.lattice_mesh),
+                        ("seam", benchmark_data.seam_mesh)):
+        vertices, mesh_faces = build(faces, radius=BED_RADIUS)
+        inputs[name] = benchmark_data.save_stl(vertices, mesh_faces, work_dir / f"{name}.stl")
+    if stages is None or "modify_gcode" in stages:
+        inputs["planar"] = benchmark_data.write_planar_gcode(work_dir / "planar.gcode", lines)
+    inputs["cylindrical"] = benchmark_data.write_cylindrical_gcode(work_dir / "cylindrical.gcode", lines,
+                                                                   radius=BED_RADIUS)
+    inputs["slicer"] = fake_slicer.make_launcher(work_dir / "bin")
+    return inputs
+
+
+def render_offscreen(gcode_path):
+    """Draw a toolpath into an offscreen plotter and grab the frame."""
+    moves = parse_cylindrical_gcode(gcode_path, coarse=True)
+    plotter = pv.Plotter(off_screen=True, window_size=(640, 480))
+    for extruding, color in ((True, "red"), (False, "gray")):
+        segments = np.array([(start, end) for start, end, e in moves if e == extruding], dtype=float)
+        if not len(segments):
+            continue
+        points = segments.reshape(-1, 3)
+        cells = np.column_stack((np.full(len(segments), 2), np.arange(0, len(points), 2),
+                                 np.arange(1, len(points), 2)))
+        plotter.add_mesh(pv.PolyData(points, lines=cells.ravel()), color=color)
+    plotter.view_isometric()
+    image = plotter.screenshot(return_img=True)
+    plotter.close()
+    return image
+
+
+def _slice_job(inputs):
+    params = {"stl_file": str(inputs["ring"]), "ini_file": str(CONFIG_PATH), "bed_radius": BED_RADIUS}
+    return slice_stl_job(params, inputs["dir"], prusaslicer_path=inputs["slicer"])
+
+
+STAGES = {
+    "unwrap_ring": lambda i: unwrap_and_repair_stl(i["ring"], i["dir"] / "stl" / "unwrapped_ring.stl"),
+    "unwrap_lattice": lambda i: unwrap_and_repair_stl(i["lattice"], i["dir"] / "stl" / "unwrapped_lattice.stl"),
+    "unwrap_seam": lambda i: unwrap_and_repair_stl(i["seam"], i["dir"] / "stl" / "unwrapped_seam.stl"),
+    "modify_gcode": lambda i: modify_gcode(i["planar"], i["dir"] / "converted.gcode", radius=BED_RADIUS),
+    "compact_gcode": lambda i: compact_gcode(i["cylindrical"], i["dir"] / "compacted.gcode"),
+    "parse_cylindrical_gcode": lambda i: parse_cylindrical_gcode(i["cylindrical"]),
+    "estimate_print": lambda i: estimate_print(i["cylindrical"]),
+    "render_offscreen": lambda i: render_offscreen(i["cylindrical"]),
+    "slice_stl_job": _slice_job,
+}
+
+
+def run_stage(func, inputs, repeat=REPEAT):
+    """Best wall time over repeat runs and the tracemalloc peak of one more run."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(inputs)
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func(inputs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"time": min(times), "peak_mb": peak / (1024 * 1024)}
+
+
+def load_history(path):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def baseline(history, machine, scale, stage):
+    """Median time and peak memory of the last BASELINE_RUNS matching results."""
+    previous = [record["results"][scale][stage] for record in history
+                if record.get("machine") == machine and stage in record["results"].get(scale, {})]
+    previous = previous[-BASELINE_RUNS:]
+    if not previous:
+        return None
+    return {"time": statistics.median(r["time"] for r in previous),
+            "peak_mb": statistics.median(r["peak_mb"] for r in previous)}
+
+
+def missing_baselines(results, history, machine):
+    """(scale, stage) pairs with no earlier result from this machine to compare against."""
+    return [(scale, stage) for scale, stages in results.items() for stage in stages
+            if baseline(history, machine, scale, stage) is None]
+
+
+def find_regressions(results, history, machine, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for scale, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline(history, machine, scale, stage)
+            if base is None:
+                continue
+            if result["time"] > MIN_TIME and result["time"] > base["time"] * (1 + threshold):
+                regressions.append((scale, stage, "time", base["time"], result["time"]))
+            if result["peak_mb"] > base["peak_mb"] * (1 + threshold) + 1.0:
+                regressions.append((scale, stage, "peak_mb", base["peak_mb"], result["peak_mb"]))
+    return regressions
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, stages=None, repeat=REPEAT, keep=False):
+    """Run the selected stages at each scale; returns {scale: {stage: result}}."""
+    results = {}
+    for scale in scales:
+        work_dir = Path(tempfile.mkdtemp(prefix=f"cyslicer_bench_{scale}_"))
+        try:
+            scale_stages = stages or SCALES[scale].get("stages", list(STAGES))
+            inputs = prepare_inputs(scale, work_dir, scale_stages)
+            results[scale] = {}
+            for stage in scale_stages:
+                result = run_stage(STAGES[stage], inputs, repeat)
+                results[scale][stage] = result
+                print(f"{scale:<8} {stage:<26} {result['time'] * 1000:10.1f} ms {result['peak_mb']:9.1f} MiB")
+        finally:
+            if keep:
+                print(f"Inputs kept in {work_dir}")
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    scales = args[args.index("--scales") + 1].split(",") if "--scales" in args else DEFAULT_SCALES
+    stages = args[args.index("--stages") + 1].split(",") if "--stages" in args else None
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else REPEAT
+    threshold = float(args[args.index("--threshold") + 1]) if "--threshold" in args else REGRESSION_THRESHOLD
+    history_path = Path(args[args.index("--history") + 1]) if "--history" in args else HISTORY_PATH
+
+    unknown = [s for s in scales if s not in SCALES] + [s for s in stages or [] if s not in STAGES]
+    if unknown:
+        print(f"Unknown scale or stage: {', '.join(unknown)}")
+        print(f"Scales: {', '.join(SCALES)}\nStages: {', '.join(STAGES)}")
+        sys.exit(2)
+
+    machine = (args[args.index("--machine") + 1] if "--machine" in args
+               else os.environ.get(MACHINE_ENV) or platform.node())
+    history = load_history(history_path)
+    results = run_benchmarks(scales, stages, repeat, keep="--keep" in args)
+    regressions = find_regressions(results, history, machine, threshold)
+    missing = missing_baselines(results, history, machine)
+
+    if "--no-record" not in args:
+        history.append({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "machine": machine,
+            "python": platform.python_version(),
+            "repeat": repeat,
+            "results": results,
+        })
+        save_history(history_path, history)
+        print(f"Results recorded in {history_path}")
+
+    if missing:
+        known = sorted({record.get("machine") for record in history} - {machine}, key=str)
+        print(f"WARNING: no baseline for machine '{machine}' in {history_path} for "
+              f"{', '.join(f'{scale}/{stage}' for scale, stage in missing)}; not checked for regressions.")
+        if known:
+            print(f"History has results for: {', '.join(map(str, known))} (use --machine or ${MACHINE_ENV}).")
+
+    for scale, stage, metric, before, after in regressions:
+        print(f"REGRESSION {scale} {stage} {metric}: {before:.4g} -> {after:.4g} "
+              f"(+{(after / before - 1) * 100:.0f}%)")
+    sys.exit(1 if regressions else 0)
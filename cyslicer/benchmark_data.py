@@ -0,0 +1,160 @@
+import math
+import random
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Cylindrical test meshes, all around the Y axis like the real parts
+# ---------------------------------------------------------------------------
+
+def _arc_solid(r_in, r_out, y0, y1, theta0, theta1, segments, closed=False):
+    """
+    Vertices and faces of a thick cylindrical shell between two angles.
+    theta follows unwrap_vertex (atan2(x, z)). With closed=True the shell
+    is a full ring and has no end caps. Faces: 8 per segment, +4 if open.
+    """
+    count = segments if closed else segments + 1
+    theta = theta0 + (theta1 - theta0) * np.arange(count) / segments
+    rings = []
+    for r, y in ((r_out, y0), (r_out, y1), (r_in, y1), (r_in, y0)):
+        rings.append(np.column_stack((r * np.sin(theta), np.full(count, y), r * np.cos(theta))))
+    vertices = np.concatenate(rings)
+
+    faces = []
+    for k in range(4):
+        a = k * count
+        b = ((k + 1) % 4) * count
+        for i in range(segments):
+            j = (i + 1) % count
+            faces.append((a + i, a + j, b + j))
+            faces.append((a + i, b + j, b + i))
+    if not closed:
+        last = count - 1
+        faces.append((0, count, 2 * count))
+        faces.append((0, 2 * count, 3 * count))
+        faces.append((last, last + 3 * count, last + 2 * count))
+        faces.append((last, last + 2 * count, last + count))
+    return vertices, np.array(faces, dtype=np.int64)
+
+
+def _combine(parts):
+    vertices, faces, offset = [], [], 0
+    for v, f in parts:
+        vertices.append(v)
+        faces.append(f + offset)
+        offset += len(v)
+    return np.concatenate(vertices), np.concatenate(faces)
+
+
+def ring_mesh(faces=2000, radius=17.0, thickness=2.0, width=10.0):
+    """Closed ring sitting on the bed radius."""
+    segments = max(3, faces // 8)
+    return _arc_solid(radius, radius + thickness, 0.0, width, 0.0, 2 * math.pi, segments, closed=True)
+
+
+def lattice_mesh(faces=2000, radius=17.0, thickness=2.0, cell=3.0, seed=0):
+    """Grid of small separate blocks around the cylinder, 12 faces each."""
+    rng = random.Random(seed)
+    cells = max(1, faces // 12)
+    per_ring = max(1, int(2 * math.pi * radius / (2 * cell)))
+    parts = []
+    for n in range(cells):
+        row, col = divmod(n, per_ring)
+        theta = (col + 0.5) * 2 * math.pi / per_ring
+        span = 0.8 * cell / radius
+        height = thickness * (0.5 + rng.random())
+        y0 = row * 2 * cell
+        parts.append(_arc_solid(radius, radius + height, y0, y0 + cell, theta, theta + span, 1))
+    return _combine(parts)
+
+
+def seam_mesh(faces=2000, radius=17.0, thickness=2.0, width=10.0, span_deg=120.0):
+    """Open arc centred on theta = 0 so it straddles the unwrap seam."""
+    segments = max(1, (faces - 4) // 8)
+    half = math.radians(span_deg) / 2
+    return _arc_solid(radius, radius + thickness, 0.0, width, -half, half, segments)
+
+
+def save_stl(vertices, faces, path):
+    """Write a binary STL without needing trimesh."""
+    triangles = vertices[faces].astype(np.float32)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    records = np.zeros(len(faces), dtype=[("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+    records["normal"] = normals
+    records["vertices"] = triangles
+    with open(path, 'wb') as f:
+        f.write(b"cyslicer benchmark mesh".ljust(80, b" "))
+        f.write(np.uint32(len(faces)).tobytes())
+        f.write(records.tobytes())
+    return path
+
+
+# ---------------------------------------------------------------------------
+# G-code
+# ---------------------------------------------------------------------------
+
+PLANAR_HEADER = [
+    "; generated by cyslicer benchmark\n",
+    "M140 S0\n",
+    "G28 ; home all axes\n",
+    "G1 Z5 F5000 ; lift nozzle\n",
+    "M109 S220 ; Wait for Hotend Temperature\n",
+    "G21\n",
+    "G90\n",
+    "M82\n",
+    "G92 E0\n",
+]
+
+
+def write_planar_gcode(path, lines=20000, width=100.0, depth=10.0, layer_height=0.2, layers=None, seed=0):
+    """
+    PrusaSlicer-like planar G-code: zig-zag extrusion over a width x depth
+    strip (width is the unwrapped X), with retracts and travels between
+    layers. Roughly `lines` motion lines in total.
+    """
+    rng = random.Random(seed)
+    layers = layers or max(1, lines // 400)
+    per_layer = max(2, lines // layers)
+    e = 0.0
+    with open(path, 'w') as f:
+        f.writelines(PLANAR_HEADER)
+        for layer in range(layers):
+            z = layer_height * (layer + 1)
+            f.write(";LAYER_CHANGE\n")
+            f.write(f";Z:{z:.3f}\n")
+            f.write(f"G1 Z{z:.3f} F720\n")
+            f.write("G1 X0.000 Y0.000 F3000\n")
+            f.write(f"G1 E{e + 0.5:.5f} F2100\n")
+            e += 0.5
+            f.write(";TYPE:Solid infill\nG1 F1800\n")
+            for i in range(per_layer):
+                x = width * i / per_layer + rng.uniform(-0.01, 0.01)
+                y = depth if i % 2 else 0.0
+                e += 0.03 * depth / 10
+                f.write(f"G1 X{x:.3f} Y{y:.3f} E{e:.5f}\n")
+            e -= 0.5
+            f.write(f"G1 E{e:.5f} F2100\n")
+    return path
+
+
+def write_cylindrical_gcode(path, lines=20000, radius=17.0, depth=10.0, layer_height=0.2, seed=0):
+    """Converted-style B/Y/Z G-code of helical passes, about `lines` moves."""
+    rng = random.Random(seed)
+    layers = max(1, lines // 400)
+    per_layer = max(2, lines // layers)
+    e = 0.0
+    with open(path, 'w') as f:
+        f.write("G0 X0 Y0 Z{:.3f}\nM82\nG92 E0\n".format(radius))
+        for layer in range(layers):
+            z = radius + layer_height * (layer + 1)
+            f.write(f";LAYER_CHANGE\nG1 F720 Z{z:.5f}\nG1 F1800\n")
+            for i in range(per_layer):
+                b = 360.0 * i / per_layer
+                y = depth * (i % 20) / 19 + rng.uniform(-0.005, 0.005)
+                e += 0.02
+                f.write(f"G1 B{b:.5f} Y{y:.5f} E{e:.5f}\n")
+            f.write(f"G1 E{e - 0.5:.5f} F2100\nG92 E0\n")
+            e = 0.0
+    return path
@@ -0,0 +1,100 @@
+import hashlib
+import os
+from pathlib import Path
+from types import MappingProxyType
+
+# Keys in user_parameters.json that belong to the pipeline, not to PrusaSlicer
+PIPELINE_KEYS = {"stl_file", "ini_file", "bed_radius"}
+
+_cache = {}
+
+
+class SlicerConfig:
+    """
+    Immutable view of a PrusaSlicer INI profile.
+
+    The original lines are kept so comments and ordering survive; overrides
+    produce a new SlicerConfig and never touch the file on disk.
+    """
+
+    __slots__ = ("_lines", "_values", "_hash")
+
+    def __init__(self, lines, values=None):
+        self._lines = tuple(lines)
+        if values is None:
+            values = {}
+            for line in self._lines:
+                if '=' in line and not line.strip().startswith('#'):
+                    key, value = line.split('=', 1)
+                    values[key.strip()] = value.strip()
+        self._values = MappingProxyType(dict(values))
+        self._hash = hashlib.sha256(self.render().encode()).hexdigest()
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    @property
+    def values(self):
+        return self._values
+
+    @property
+    def content_hash(self):
+        return self._hash
+
+    def with_overrides(self, params):
+        """Return a new config with params applied, skipping PIPELINE_KEYS."""
+        values = dict(self._values)
+        changed = False
+        for key, new_value in params.items():
+            if key in PIPELINE_KEYS:
+                continue
+            if values.get(key) != str(new_value):
+                values[key] = str(new_value)
+                changed = True
+        return SlicerConfig(self._lines, values) if changed else self
+
+    def render(self):
+        out = []
+        seen = set()
+        for line in self._lines:
+            if '=' in line and not line.strip().startswith('#'):
+                key = line.split('=', 1)[0].strip()
+                seen.add(key)
+                out.append(f"{key} = {self._values[key]}\n")
+            else:
+                out.append(line + '\n')
+        out.extend(f"{key} = {value}\n" for key, value in self._values.items() if key not in seen)
+        return "".join(out)
+
+    def write_job_ini(self, job_dir):
+        """
+        Write this config into job_dir, named by content hash. An existing
+        file with the same hash is reused as is. Returns the INI path.
+        """
+        job_dir = Path(job_dir)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        path = job_dir / f"config_{self._hash[:16]}.ini"
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        return path
+
+
+def load_ini(ini_path):
+    """Parse an INI profile once per content hash and return a SlicerConfig."""
+    with open(ini_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    config = _cache.get(digest)
+    if config is None:
+        config = SlicerConfig(data.decode().splitlines())
+        _cache[digest] = config
+    return config
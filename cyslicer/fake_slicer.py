@@ -0,0 +1,59 @@
+## fake_slicer.py
+# Stand-in for the PrusaSlicer CLI so the pipeline can run without it.
+#
+# Accepts the arguments slice_stl_with_prusaslicer passes
+# (--slice --load <ini> --output <gcode> <stl>) and writes deterministic
+# planar G-code covering the STL's bounding box, one zig-zag line per
+# extrusion width and one layer per layer_height.
+import os
+import stat
+import sys
+from pathlib import Path
+
+import numpy as np
+from stl import mesh
+
+from config_utils import load_ini
+from benchmark_data import write_planar_gcode
+
+EXTRUSION_WIDTH = 0.45
+
+
+def fake_slice(config_path, stl_path, output_path):
+    vertices = mesh.Mesh.from_file(str(stl_path)).vectors.reshape(-1, 3)
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    width, depth, height = np.maximum(high - low, EXTRUSION_WIDTH)
+
+    layer_height = float(load_ini(config_path).get("layer_height", 0.2))
+    layers = max(1, int(round(height / layer_height)))
+    per_layer = max(2, int(width / EXTRUSION_WIDTH))
+    write_planar_gcode(output_path, lines=layers * per_layer, width=float(width), depth=float(depth),
+                       layer_height=layer_height, layers=layers)
+
+
+def make_launcher(directory):
+    """
+    Write an executable that runs this script with the current Python and
+    return its path, for use as prusaslicer_path.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    script = Path(__file__).resolve()
+    if os.name == "nt":
+        launcher = directory / "fake-prusa-slicer.bat"
+        launcher.write_text(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        launcher = directory / "fake-prusa-slicer"
+        launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        launcher.chmod(launcher.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return launcher
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--load" not in args or "--output" not in args:
+        print("Usage: fake_slicer.py --slice --load <ini> --output <gcode> <stl>", file=sys.stderr)
+        sys.exit(1)
+    config = args[args.index("--load") + 1]
+    output = args[args.index("--output") + 1]
+    fake_slice(config, args[-1], output)
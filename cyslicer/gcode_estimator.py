@@ -0,0 +1,297 @@
+import re
+import sys
+import numpy as np
+
+from config_utils import load_ini
+from gcode_utils import MAX_ANGULAR_SPEED
+
+# Machine limits used by the estimator. B is in degrees, the rest in mm.
+DEFAULT_LIMITS = {
+    "max_feedrate": {"B": MAX_ANGULAR_SPEED, "Y": 500.0, "Z": 12.0, "E": 120.0},   # per second
+    "max_acceleration": {"B": 3600.0, "Y": 1000.0, "Z": 200.0, "E": 5000.0},      # per second^2
+    "acceleration": 1250.0,
+}
+DEFAULT_FEED = 3000.0       # mm/min until the file sets one
+FILAMENT_DIAMETER = 1.75
+CHUNK_SIZE = 8 * 1024 * 1024    # bytes; the per-word arrays of a chunk are a few times this
+
+AXES = "BYZEF"
+MAX_DIGITS = 15             # longest mantissa parsed in bulk; longer numbers go through float()
+_PAD = 16                   # longest number parsed in bulk, in characters; also the padding after a chunk
+_LAYER_CHANGE = np.frombuffer(b";LAYER_CHANGE", np.uint8)
+_POW10 = 10.0 ** np.arange(_PAD)
+_COLUMN = np.full(256, -1, dtype=np.int8)
+_COLUMN[np.frombuffer(AXES.encode(), np.uint8)] = np.arange(len(AXES))
+
+
+def limits_from_ini(ini_path, limits=None):
+    """
+    Overlay the PrusaSlicer machine_max_* values for Y, Z and E on the
+    estimator limits. The planar X limits do not apply to the B axis.
+    """
+    limits = {k: (dict(v) if isinstance(v, dict) else v) for k, v in (limits or DEFAULT_LIMITS).items()}
+    for key, value in load_ini(ini_path).values.items():
+        m = re.fullmatch(r'machine_max_(feedrate|acceleration)_([yze])', key)
+        if m and value:
+            limits["max_" + m.group(1)][m.group(2).upper()] = float(value.split(',')[0])
+        elif key == "machine_max_acceleration_extruding" and value:
+            limits["acceleration"] = float(value.split(',')[0])
+    return limits
+
+
+def _read_chunks(file_path):
+    with open(file_path, 'rb') as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                return
+            yield data + f.readline()
+
+
+def _separators(buf):
+    # Whitespace as bytes.split() sees it (tab to carriage return, space); a comment also ends a word
+    return (buf - np.uint8(ord('\t')) <= ord('\r') - ord('\t')) | (buf == ord(' ')) | (buf == ord(';'))
+
+
+def _parse_numbers(data, buf, start, end):
+    """
+    Values of the words data[start:end], NaN where a word is not a number.
+    Plain decimals are read one character position at a time across all
+    words into an integer mantissa over a power of ten, which rounds
+    exactly like float(); anything else goes through float() one word at
+    a time.
+    """
+    length = np.minimum(end - start, _PAD + 1).astype(np.int8)
+    signed = (buf[start] == ord('-')) | (buf[start] == ord('+'))
+    # Nine digits always fit in 32 bits; longer words carry on in 64
+    mantissa = np.zeros(len(start), dtype=np.uint32)
+    n_digits = np.zeros(len(start), dtype=np.int8)
+    n_dots = np.zeros(len(start), dtype=np.int8)
+    dot_at = np.zeros(len(start), dtype=np.int8)
+    for k in range(min(int(length.max(initial=0)), _PAD)):
+        if k == 9:
+            mantissa = mantissa.astype(np.int64)
+        c = buf[k:][start]
+        inside = length > k
+        d = c - np.uint8(ord('0'))
+        digit = (d < 10) & inside
+        dot = (c == ord('.')) & inside
+        # Horner's rule; other characters multiply by one and add nothing
+        mantissa *= digit.view(np.uint8) * np.uint8(9) + np.uint8(1)
+        mantissa += d * digit
+        n_digits += digit
+        n_dots += dot
+        dot_at += dot * np.int8(k)
+    # A plain number is made of nothing but its digits, at most one dot and a leading sign
+    plain = ((n_digits + n_dots + signed == length) & (n_digits > 0) & (n_digits <= MAX_DIGITS)
+             & (n_dots <= 1) & (length <= _PAD))
+    decimals = np.where(n_dots > 0, length - 1 - dot_at, 0)
+
+    vals = mantissa / _POW10[decimals]
+    vals[buf[start] == ord('-')] *= -1
+    vals[~plain] = np.nan
+    for i in np.flatnonzero(~plain & (length > 0)):
+        # Stray words such as macro names, exponents or very long numbers
+        try:
+            vals[i] = float(data[start[i]:end[i]])
+        except ValueError:
+            pass
+    return vals
+
+
+def _parse_chunk(data):
+    """
+    Tokenise a block of G-code into per-line arrays straight from its
+    bytes, without a Python object per line or word. Returns
+    (cmd, values, layer_marks) where cmd is the G code (M codes offset by
+    1000, -1 otherwise) and values has one NaN-padded column per axis in
+    AXES.
+    """
+    size = len(data)
+    data = b" " + data + b" " * _PAD
+    buf = np.frombuffer(data, np.uint8)
+    line_ends = np.flatnonzero(buf == ord('\n'))
+    n_lines = len(line_ends) + 1
+
+    # Everything from the first ';' of a line is a comment
+    semis = np.flatnonzero(buf == ord(';'))
+    semi_lines = np.searchsorted(line_ends, semis)
+    first_semi = np.ones(len(semis), dtype=bool)
+    first_semi[1:] = semi_lines[1:] != semi_lines[:-1]
+    semis, semi_lines = semis[first_semi], semi_lines[first_semi]
+    comment = np.full(n_lines, len(buf))
+    comment[semi_lines] = semis
+    layer_marks = np.zeros(n_lines, dtype=np.int64)
+    marker = buf[semis[:, None] + np.arange(len(_LAYER_CHANGE))]
+    layer_marks[semi_lines[(marker == _LAYER_CHANGE).all(axis=1)]] = 1
+
+    # Words are runs between separators; the padding on both sides makes
+    # the changes alternate between a word's start and its end
+    sep = _separators(buf[:size + 2])
+    edges = np.flatnonzero(sep[1:] != sep[:-1]) + 1
+    starts, ends = edges[0::2], edges[1::2]
+    # A word's line is the count of line ends before it, found from the (fewer) line ends
+    line = np.cumsum(np.bincount(np.searchsorted(starts, line_ends), minlength=len(starts) + 1)[:-1])
+    code = starts < comment[line]
+    starts, ends, line = starts[code], ends[code], line[code]
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = line[1:] != line[:-1]
+
+    letter = buf[starts]
+    wanted = np.isin(letter, list(b"GM" + AXES.encode()))
+    starts, ends, line, letter, first = starts[wanted], ends[wanted], line[wanted], letter[wanted], first[wanted]
+    vals = _parse_numbers(data, buf, starts + 1, ends)
+    numeric = ~np.isnan(vals)
+
+    cmd = np.full(n_lines, -1.0)
+    is_g = first & numeric & (letter == ord('G'))
+    is_m = first & numeric & (letter == ord('M'))
+    cmd[line[is_g]] = vals[is_g]
+    cmd[line[is_m]] = vals[is_m] + 1000
+
+    values = np.full((n_lines, len(AXES)), np.nan)
+    col = _COLUMN[letter]
+    sel = numeric & ~first & (col >= 0)
+    values[line[sel], col[sel]] = vals[sel]
+    return cmd, values, layer_marks
+
+
+def _ffill(col):
+    idx = np.where(np.isnan(col), 0, np.arange(len(col)))
+    np.maximum.accumulate(idx, out=idx)
+    return col[idx]
+
+
+def _move_times(d, de, feed, limits):
+    """Trapezoidal move durations for axis deltas d (n x 3, B/Y/Z) and de."""
+    length = np.linalg.norm(d, axis=1)
+    e_only = (length == 0) & (de != 0)
+    length = np.where(e_only, np.abs(de), length)
+    safe_len = np.where(length > 0, length, 1.0)
+
+    v = feed / 60.0
+    a = np.full(len(length), limits["acceleration"])
+    for i, axis in enumerate("BYZ"):
+        ratio = np.abs(d[:, i]) / safe_len
+        with np.errstate(divide='ignore'):
+            v = np.minimum(v, limits["max_feedrate"][axis] / ratio)
+            a = np.minimum(a, limits["max_acceleration"][axis] / ratio)
+    ratio = np.abs(de) / safe_len
+    with np.errstate(divide='ignore'):
+        v = np.minimum(v, limits["max_feedrate"]["E"] / ratio)
+        a = np.minimum(a, limits["max_acceleration"]["E"] / ratio)
+
+    # Junction speed from the angle between consecutive moves; retracts stop
+    unit = d / safe_len[:, None]
+    cos = np.einsum('ij,ij->i', unit[:-1], unit[1:])
+    vj = np.minimum(v[:-1], v[1:]) * np.clip((1 + cos) / 2, 0, 1)
+    vj = np.where(e_only[:-1] | e_only[1:], 0.0, vj)
+    vj = np.minimum(vj, np.sqrt(2 * a[:-1] * length[:-1]))
+    vj = np.minimum(vj, np.sqrt(2 * a[1:] * length[1:]))
+    v0 = np.concatenate(([0.0], vj))
+    v1 = np.concatenate((vj, [0.0]))
+
+    peak = np.sqrt((2 * a * length + v0 ** 2 + v1 ** 2) / 2)
+    cruise = np.minimum(v, peak)
+    accel_dist = (cruise ** 2 - v0 ** 2) / (2 * a) + (cruise ** 2 - v1 ** 2) / (2 * a)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (cruise - v0) / a + (cruise - v1) / a + np.maximum(length - accel_dist, 0) / cruise
+    # Entry and exit speeds that cannot be joined within the move fall back to their mean
+    infeasible = np.abs(v1 ** 2 - v0 ** 2) > 2 * a * length
+    t = np.where(infeasible, 2 * length / np.maximum(v0 + v1, 1e-9), t)
+    return np.where(length > 0, t, 0.0)
+
+
+def estimate_print(file_path, limits=None, filament_diameter=FILAMENT_DIAMETER):
+    """
+    Estimate print time and filament use of cylindrical B/Y/Z G-code.
+
+    The file is processed in chunks and every move is evaluated with numpy.
+    Returns a dict with total time (s), filament (mm and mm^3), and the
+    per-layer time and filament arrays indexed by ;LAYER_CHANGE count
+    (index 0 is the start sequence).
+    """
+    limits = limits or DEFAULT_LIMITS
+    state = np.array([0.0, 0.0, 0.0, 0.0, DEFAULT_FEED])
+    relative_e = False
+    layer = 0
+    layer_time = np.zeros(1)
+    layer_filament = np.zeros(1)
+    n_moves = 0
+    e_net = e_peak = 0.0
+
+    for data in _read_chunks(file_path):
+        cmd, values, layer_marks = _parse_chunk(data)
+        layers = layer + np.cumsum(layer_marks)
+        layer = int(layers[-1]) if len(layers) else layer
+
+        # E mode switches affect the moves that follow them
+        mode = np.where(cmd == 1083, 1.0, np.where(cmd == 1082, 0.0, np.nan))
+        rows = np.isin(cmd, (0, 1, 92)) | ~np.isnan(mode)
+        cmd, values, layers, mode = cmd[rows], values[rows], layers[rows], mode[rows]
+        mode = _ffill(np.concatenate(([float(relative_e)], mode)))[1:]
+        if len(mode):
+            relative_e = bool(mode[-1])
+
+        moving = np.isin(cmd, (0, 1))
+        values[~moving, 4] = np.nan           # only moves set the feed
+        values[cmd >= 1000] = np.nan
+        e_raw = values[:, 3].copy()
+        values[(mode == 1) & moving, 3] = np.nan
+        filled = np.vstack((state, values))
+        for col in range(len(AXES)):
+            filled[:, col] = _ffill(filled[:, col])
+        state = filled[-1].copy()
+
+        deltas = np.diff(filled[:, :4], axis=0)
+        de = np.where(mode == 1, np.nan_to_num(e_raw), deltas[:, 3])
+        # G92 and mode rows redefine the position without moving
+        deltas[~moving] = 0
+        de = np.where(moving, de, 0.0)
+
+        t = _move_times(deltas[moving, :3], de[moving], filled[1:, 4][moving], limits)
+        move_layers = layers[moving]
+        # Filament is used only when net extrusion passes its previous peak,
+        # so an unretract just refills what the retract before it took back
+        net = e_net + np.cumsum(de[moving])
+        peak = np.maximum.accumulate(np.concatenate(([e_peak], net)))
+        extruded = np.diff(peak)
+        if len(net):
+            e_net, e_peak = float(net[-1]), float(peak[-1])
+        size = max(layer + 1, len(layer_time))
+        layer_time = np.pad(layer_time, (0, size - len(layer_time)))
+        layer_filament = np.pad(layer_filament, (0, size - len(layer_filament)))
+        layer_time += np.bincount(move_layers, weights=t, minlength=size)
+        layer_filament += np.bincount(move_layers, weights=extruded, minlength=size)
+        n_moves += int(np.count_nonzero(moving))
+
+    filament = float(layer_filament.sum())
+    return {
+        "total_time": float(layer_time.sum()),
+        "filament_mm": filament,
+        "filament_mm3": filament * np.pi * (filament_diameter / 2) ** 2,
+        "layer_time": layer_time,
+        "layer_filament": layer_filament,
+        "moves": n_moves,
+    }
+
+
+def format_duration(seconds):
+    hours, rem = divmod(int(round(seconds)), 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{hours}h {minutes:02d}m {secs:02d}s" if hours else f"{minutes}m {secs:02d}s"
+
+
+def print_estimate(estimate):
+    print(f"Estimated print time: {format_duration(estimate['total_time'])} "
+          f"over {len(estimate['layer_time']) - 1} layers ({estimate['moves']} moves)")
+    print(f"Filament used: {estimate['filament_mm'] / 1000:.2f} m ({estimate['filament_mm3'] / 1000:.2f} cm3)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python gcode_estimator.py <gcode_file> [config.ini]")
+        sys.exit(1)
+
+    limits = limits_from_ini(sys.argv[2]) if len(sys.argv) > 2 else None
+    print_estimate(estimate_print(sys.argv[1], limits))
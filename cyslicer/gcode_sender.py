@@ -0,0 +1,266 @@
+import asyncio
+import os
+import re
+import sys
+import time
+
+from collections import deque
+
+RX_BUFFER_SIZE = 128       # Marlin's default serial receive buffer, bytes
+MAX_IN_FLIGHT = 32         # upper bound on unacknowledged lines
+HISTORY_SIZE = 1024        # sent lines kept for resend requests
+OK_TIMEOUT = 10.0          # s of printer silence before unacknowledged lines are replayed
+BAUD_RATE = 115200
+
+resend_re = re.compile(r'(?:Resend:|rs)\s*N?:?\s*(\d+)', re.IGNORECASE)
+
+
+def checksum(line):
+    cs = 0
+    for c in line.encode():
+        cs ^= c
+    return cs
+
+
+def numbered_line(n, command):
+    line = f"N{n} {command}"
+    return f"{line}*{checksum(line)}\n"
+
+
+def read_commands(gcode_path):
+    """Yield the commands of a G-code file with comments and blank lines removed."""
+    with open(gcode_path, 'r') as f:
+        for line in f:
+            command = line.split(';', 1)[0].strip()
+            if command:
+                yield command
+
+
+class _TTYStream:
+    # Minimal asyncio reader/writer pair over a serial device or pty
+    def __init__(self, fd):
+        self.fd = fd
+        self._buffer = b""
+        self._loop = asyncio.get_running_loop()
+
+    async def readline(self):
+        while b"\n" not in self._buffer:
+            ready = self._loop.create_future()
+            self._loop.add_reader(self.fd, ready.set_result, None)
+            try:
+                await ready
+            finally:
+                self._loop.remove_reader(self.fd)
+            chunk = os.read(self.fd, 4096)
+            if not chunk:
+                return b""
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line + b"\n"
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+async def open_printer(target, baud=BAUD_RATE):
+    """
+    Open a printer connection. target is either host:port for a TCP
+    socket or a serial device / pty path. Returns (reader, writer).
+    """
+    host, sep, port = target.rpartition(":")
+    if sep and port.isdigit() and not os.path.exists(target):
+        return await asyncio.open_connection(host, int(port))
+
+    import termios
+    import tty
+    fd = os.open(target, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    speed = getattr(termios, f"B{baud}", termios.B115200)
+    attrs[4] = attrs[5] = speed
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    stream = _TTYStream(fd)
+    return stream, stream
+
+
+class GcodeSender:
+    """
+    Stream numbered, checksummed G-code using character-count flow control.
+
+    Lines are sent as long as the bytes of all unacknowledged lines fit in
+    the printer's receive buffer, so the planner never waits on a round
+    trip. With rx_buffer=None it falls back to one line per ok. If the
+    printer says nothing for ok_timeout seconds while lines are
+    unacknowledged, they are replayed from the oldest one.
+    """
+
+    def __init__(self, reader, writer, rx_buffer=RX_BUFFER_SIZE, max_in_flight=MAX_IN_FLIGHT,
+                 on_line=None, ok_timeout=OK_TIMEOUT):
+        self.reader = reader
+        self.writer = writer
+        self.rx_buffer = rx_buffer
+        self.max_in_flight = max_in_flight if rx_buffer else 1
+        self.on_line = on_line
+        self.ok_timeout = ok_timeout
+        self.history = {}
+        self.in_flight = deque()
+        self.in_flight_bytes = 0
+        self.next_n = 1
+        self.resend_from = None
+        self.stats = {"lines": 0, "bytes": 0, "resends": 0, "timeouts": 0, "oks": 0, "elapsed": 0.0}
+        self._slot = asyncio.Event()
+        self._error = None
+        self._last_response = time.monotonic()
+        self._resend_ok = False
+
+    def _fits(self, size):
+        if len(self.in_flight) >= self.max_in_flight:
+            return False
+        if not self.rx_buffer:
+            return not self.in_flight
+        return not self.in_flight or self.in_flight_bytes + size <= self.rx_buffer
+
+    async def _write(self, n, data):
+        self.writer.write(data)
+        await self.writer.drain()
+        self.in_flight.append((n, len(data)))
+        self.in_flight_bytes += len(data)
+        self.stats["bytes"] += len(data)
+
+    def _replay_unacknowledged(self):
+        # No reply in time: an ok or a resend request was lost
+        self.stats["timeouts"] += 1
+        if self.in_flight:
+            self.resend_from = self.in_flight[0][0]
+            self.in_flight.clear()
+            self.in_flight_bytes = 0
+
+    async def _wait_for_slot(self):
+        self._slot.clear()
+        while not self._slot.is_set():
+            remaining = self._last_response + self.ok_timeout - time.monotonic()
+            try:
+                await asyncio.wait_for(self._slot.wait(), max(remaining, 0.001))
+            except asyncio.TimeoutError:
+                if time.monotonic() - self._last_response >= self.ok_timeout:
+                    self._last_response = time.monotonic()
+                    self._replay_unacknowledged()
+                    break
+        if self._error:
+            raise self._error
+
+    async def _read_responses(self):
+        while True:
+            raw = await self.reader.readline()
+            if not raw:
+                self._error = ConnectionError("Printer closed the connection.")
+                self._slot.set()
+                return
+            self._last_response = time.monotonic()
+            response = raw.decode(errors="replace").strip()
+            if self.on_line:
+                self.on_line(response)
+            match = resend_re.search(response)
+            if match:
+                # The firmware flushes its receive buffer and drops everything
+                # after a bad line; replay from there
+                self.resend_from = int(match.group(1))
+                self.stats["resends"] += 1
+                self.in_flight.clear()
+                self.in_flight_bytes = 0
+                self._resend_ok = True
+                self._slot.set()
+            elif response.startswith("ok"):
+                self.stats["oks"] += 1
+                if self._resend_ok:
+                    # The ok following a resend request acknowledges no line
+                    self._resend_ok = False
+                elif self.in_flight:
+                    _, size = self.in_flight.popleft()
+                    self.in_flight_bytes -= size
+                self._slot.set()
+
+    async def _send_one(self, n, data):
+        # Returns False without sending when a resend request arrives first
+        while not self._fits(len(data)):
+            if self.resend_from is not None:
+                return False
+            await self._wait_for_slot()
+        if self.resend_from is not None:
+            return False
+        await self._write(n, data)
+        return True
+
+    async def _replay(self):
+        while self.resend_from is not None:
+            start, self.resend_from = self.resend_from, None
+            for n in range(start, self.next_n):
+                if not await self._send_one(n, self.history[n]):
+                    break
+
+    async def _send_line(self, n, data):
+        while True:
+            await self._replay()
+            if await self._send_one(n, data):
+                return
+
+    async def send(self, commands):
+        """Send an iterable of commands and wait for every line to be acknowledged."""
+        reader_task = asyncio.create_task(self._read_responses())
+        start = time.perf_counter()
+        try:
+            self.history[0] = numbered_line(0, "M110 N0").encode()
+            await self._send_line(0, self.history[0])
+            for command in commands:
+                data = numbered_line(self.next_n, command).encode()
+                self.history[self.next_n] = data
+                self.history.pop(self.next_n - HISTORY_SIZE, None)
+                await self._send_line(self.next_n, data)
+                self.next_n += 1
+                self.stats["lines"] += 1
+            while self.in_flight or self.resend_from is not None:
+                await self._replay()
+                if self.in_flight:
+                    await self._wait_for_slot()
+        finally:
+            reader_task.cancel()
+        self.stats["elapsed"] = time.perf_counter() - start
+        return self.stats
+
+
+def format_stats(stats):
+    elapsed = stats["elapsed"] or 1e-9
+    return (f"Sent {stats['lines']} lines ({stats['bytes']} bytes) in {elapsed:.2f} s: "
+            f"{stats['lines'] / elapsed:.0f} lines/s, {stats['bytes'] / elapsed / 1024:.1f} KiB/s, "
+            f"{stats['resends']} resends")
+
+
+async def stream_file(gcode_path, target, rx_buffer=RX_BUFFER_SIZE, baud=BAUD_RATE):
+    reader, writer = await open_printer(target, baud)
+    try:
+        sender = GcodeSender(reader, writer, rx_buffer=rx_buffer)
+        return await sender.send(read_commands(gcode_path))
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python gcode_sender.py <gcode_file> <host:port|serial_device> "
+              "[--buffer BYTES] [--baud RATE] [--ping-pong]")
+        sys.exit(1)
+
+    args = sys.argv[3:]
+    rx = int(args[args.index("--buffer") + 1]) if "--buffer" in args else RX_BUFFER_SIZE
+    baud = int(args[args.index("--baud") + 1]) if "--baud" in args else BAUD_RATE
+    if "--ping-pong" in args:
+        rx = None
+    print(format_stats(asyncio.run(stream_file(sys.argv[1], sys.argv[2], rx, baud))))
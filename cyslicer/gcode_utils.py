@@ -2,7 +2,21 @@ import re
 import math
 from pathlib import Path
 
-def modify_gcode(input_path, output_path, radius=20.0):
+import instrumentation
+
+# Fastest the B axis may be driven when feed compensation is active, deg/s
+MAX_ANGULAR_SPEED = 720.0
+
+@instrumentation.traced("modify_gcode")
+def modify_gcode(input_path, output_path, radius=20.0, compensate_feed=True,
+                 max_angular_speed=MAX_ANGULAR_SPEED):
+    """
+    Convert planar G-code from PrusaSlicer into cylindrical B/Y/Z G-code.
+
+    With compensate_feed, moves that turn the B axis get an F scaled so the
+    nozzle covers the surface distance at the current radius (z_val + radius)
+    at the sliced feed rate, capped at max_angular_speed (deg/s).
+    """
     with open(input_path, 'r') as f:
         lines = f.readlines()
 
@@ -25,6 +39,11 @@ def modify_gcode(input_path, output_path, radius=20.0):
     #print(f"first z_val is: {z_val}")
     new_line = f"G0 X0 Y0 Z{radius:.3f} ; updated Z by +100\n"
     updated_lines.append(new_line)
+    prev_b = prev_y = 0.0
+    # Last Z sent to the machine; d_z is measured in that frame, not the slicer's
+    prev_z = radius
+    target_f = machine_f = None
+    converted = 0
     for line in lines:
         stripped = line.strip()
 
@@ -39,6 +58,7 @@ def modify_gcode(input_path, output_path, radius=20.0):
                 z_val = float(z_match.group(1)) + 100
                 new_line = f"G0 X0 Y0 Z{z_val:.3f} ; updated Z by +100\n"
                 updated_lines.append(new_line)
+                prev_z = z_val
             continue
 
         if 'Wait for Hotend Temperature' in stripped:
@@ -57,23 +77,350 @@ def modify_gcode(input_path, output_path, radius=20.0):
             f = re.search(r'F([-+]?[0-9]*\.?[0-9]+)', line)
             e = re.search(r'E([-+]?[0-9]*\.?[0-9]+)', line)
 
-            parts = [cmd]
-            if f: parts.append(f"F{f.group(1)}")
+            if f:
+                target_f = float(f.group(1))
+            d_b = d_y = d_z = 0.0
+            b_val = None
             if x:
                 b_val = ((float(x.group(1)) - MINX) / ((z_val + radius) * 2 * math.pi-1.6)) * 360
-                parts.append(f"B{b_val:.5f}")
+                d_b = b_val - prev_b
+                prev_b = b_val
+            # Machine Z is the nozzle's distance from the axis at the start of the move
+            surface_radius = prev_z
             if y:
-                parts.append(f"Y{float(y.group(1)) - MINY:.5f}")
+                y_val = float(y.group(1)) - MINY
+                d_y = y_val - prev_y
+                prev_y = y_val
             if z:
                 z_val = float(z.group(1))
+                d_z = z_val + radius - prev_z
+                prev_z = z_val + radius
+
+            f_word = f"F{f.group(1)}" if f else None
+            if compensate_feed and target_f and d_b != 0:
+                # Machine feed applies to the B/Y/Z vector with B in degrees,
+                # so rescale it to the distance travelled on the surface
+                commanded = math.sqrt(d_b ** 2 + d_y ** 2 + d_z ** 2)
+                surface = math.sqrt((math.radians(d_b) * surface_radius) ** 2 + d_y ** 2 + d_z ** 2)
+                feed = target_f * commanded / surface if surface > 0 else target_f
+                if max_angular_speed:
+                    feed = min(feed, max_angular_speed * 60 * commanded / abs(d_b))
+                f_word = f"F{feed:.2f}"
+                machine_f = feed
+            elif f:
+                machine_f = target_f
+            elif compensate_feed and target_f and machine_f != target_f and (x or y or z or e):
+                # Restore the sliced feed after a compensated move
+                f_word = f"F{target_f:g}"
+                machine_f = target_f
+
+            parts = [cmd]
+            if f_word: parts.append(f_word)
+            if b_val is not None:
+                parts.append(f"B{b_val:.5f}")
+            if y:
+                parts.append(f"Y{y_val:.5f}")
+            if z:
                 parts.append(f"Z{z_val + radius:.5f}")
             if e: parts.append(f"E{e.group(1)}")
 
             updated_lines.append(" ".join(parts) + "\n")
+            converted += 1
         else:
             updated_lines.append(line)
 
     with open(output_path, 'w') as f:
         f.writelines(updated_lines)
 
+    instrumentation.count("gcode_lines_in", len(lines))
+    instrumentation.count("gcode_lines_converted", converted)
     print(f"Modified G-code saved to: {output_path}")
+
+
+move_re = re.compile(r'^(G0|G1)\b')
+word_re = re.compile(r'([A-Z])([-+]?[0-9]*\.?[0-9]+)')
+
+# Relative tolerance on extrusion per mm when merging extruding moves
+FLOW_TOLERANCE = 0.02
+# Longest run of source moves folded into a single command
+MAX_MERGED_MOVES = 200
+
+
+def _scaled_point(b, y, z, ref_radius):
+    # B is in degrees; scale it to surface mm at the reference radius so the
+    # tolerance means the same thing on every axis
+    return (math.radians(b) * ref_radius, y, z)
+
+
+def _point_segment_distance(p, a, b):
+    ab = [b[i] - a[i] for i in range(3)]
+    ap = [p[i] - a[i] for i in range(3)]
+    denom = sum(c * c for c in ab)
+    t = 0.0 if denom == 0 else max(0.0, min(1.0, sum(ap[i] * ab[i] for i in range(3)) / denom))
+    return math.sqrt(sum((ap[i] - t * ab[i]) ** 2 for i in range(3)))
+
+
+def _direction_cone(p, a, tolerance):
+    """
+    Directions from a whose ray passes within tolerance of p, as a cone
+    (unit axis, half angle), plus the distance from a to p. A point within
+    tolerance of a allows every direction (axis None, half angle pi).
+    """
+    v = [p[i] - a[i] for i in range(3)]
+    length = math.sqrt(sum(c * c for c in v))
+    if length <= tolerance:
+        return None, math.pi, length
+    return [c / length for c in v], math.asin(tolerance / length), length
+
+
+def _angle_between(u, v):
+    return math.acos(max(-1.0, min(1.0, sum(u[i] * v[i] for i in range(3)))))
+
+
+def _intersect_cones(u1, a1, u2, a2):
+    """
+    Largest cone inside both cones, or None when they do not overlap.
+    Keeping the inscribed cone makes repeated intersection conservative.
+    """
+    if u1 is None:
+        return u2, a2
+    if u2 is None:
+        return u1, a1
+    theta = _angle_between(u1, u2)
+    if theta + a2 <= a1:
+        return u2, a2
+    if theta + a1 <= a2:
+        return u1, a1
+    if theta > a1 + a2:
+        return None
+    # The overlap spans (theta - a2 .. a1) from u1 along the great circle to u2
+    phi = (theta - a2 + a1) / 2
+    w1, w2 = math.sin(theta - phi) / math.sin(theta), math.sin(phi) / math.sin(theta)
+    axis = [w1 * u1[i] + w2 * u2[i] for i in range(3)]
+    norm = math.sqrt(sum(c * c for c in axis))
+    return [c / norm for c in axis], (a1 + a2 - theta) / 2
+
+
+def _same_feed(a, b):
+    # Compensated feeds of collinear moves differ only by rounding noise
+    if a is None or b is None:
+        return a == b
+    return abs(float(a) - float(b)) <= FLOW_TOLERANCE * abs(float(a))
+
+
+def _strip_feed(line):
+    return re.sub(r'\s*F[-+]?[0-9]*\.?[0-9]+', '', line, count=1)
+
+
+@instrumentation.traced("compact_gcode")
+def compact_gcode(input_path, output_path, tolerance=0.01):
+    """
+    Merge consecutive converted B/Y/Z moves that are collinear within
+    tolerance (mm, B measured on the surface at the current radius) and
+    drop F words that repeat the modal feed rate.
+
+    Only moves without an X word are touched, so the unconverted start
+    sequence passes through as is. Any non-move line ends the current run.
+    Returns a dict with the command counts before and after.
+    """
+    stats = {"lines_in": 0, "lines_out": 0, "moves_in": 0, "moves_out": 0}
+    pos = {'B': 0.0, 'Y': 0.0, 'Z': 0.0, 'E': 0.0}
+    modal_f = None
+    relative_e = False
+    run = None
+
+    def write(out, line):
+        out.write(line)
+        stats["lines_out"] += 1
+
+    def flush(out):
+        nonlocal run, modal_f
+        if run is None:
+            return
+        if len(run["lines"]) == 1:
+            line = run["lines"][0]
+        else:
+            parts = [run["cmd"]]
+            if run["f"] is not None:
+                parts.append(f"F{run['f']}")
+            for axis in ('B', 'Y', 'Z'):
+                if axis in run["words"]:
+                    parts.append(f"{axis}{run['words'][axis]}")
+            if run["de"] != 0 or 'E' in run["words"]:
+                e_word = f"{run['de']:.5f}" if relative_e else run["words"]['E']
+                parts.append(f"E{e_word}")
+            line = " ".join(parts) + "\n"
+        if run["f"] is not None:
+            if run["f"] == modal_f:
+                line = _strip_feed(line.strip()) + "\n"
+            modal_f = run["f"]
+        write(out, line)
+        stats["moves_out"] += 1
+        run = None
+
+    with open(input_path, 'r') as fin, open(output_path, 'w') as out:
+        for line in fin:
+            stats["lines_in"] += 1
+            stripped = line.strip()
+            upper = stripped.upper()
+
+            if upper.startswith(('M82', 'M83')):
+                flush(out)
+                relative_e = upper.startswith('M83')
+                write(out, line)
+                continue
+
+            if upper.startswith('G92'):
+                flush(out)
+                e = re.search(r'E([-+]?[0-9]*\.?[0-9]+)', stripped)
+                if e:
+                    pos['E'] = float(e.group(1))
+                write(out, line)
+                continue
+
+            if not move_re.match(stripped):
+                flush(out)
+                write(out, line)
+                continue
+
+            stats["moves_in"] += 1
+            cmd = stripped[:2]
+            words = dict(word_re.findall(stripped.split(';')[0]))
+            start = dict(pos)
+            for axis in ('B', 'Y', 'Z'):
+                if axis in words:
+                    pos[axis] = float(words[axis])
+            de = 0.0
+            if 'E' in words:
+                de = float(words['E']) if relative_e else float(words['E']) - start['E']
+                pos['E'] = start['E'] + de if relative_e else float(words['E'])
+            f = words.get('F')
+
+            ref = abs(start['Z'])
+            a = _scaled_point(start['B'], start['Y'], start['Z'], ref)
+            b = _scaled_point(pos['B'], pos['Y'], pos['Z'], ref)
+            length = math.dist(a, b)
+
+            # Unconverted, commented or zero-length moves (retracts, feed changes) are never merged
+            if ';' in stripped or 'X' in words or length == 0:
+                flush(out)
+                if f is not None:
+                    if f == modal_f and 'X' not in words and ';' not in stripped:
+                        line = _strip_feed(stripped)
+                        if line == cmd:
+                            continue
+                        line += "\n"
+                    modal_f = f
+                write(out, line)
+                stats["moves_out"] += 1
+                continue
+
+            extruding = de > 0
+            flow = de / length
+            feed = f if f is not None else (run["feed"] if run else modal_f)
+
+            if run is not None:
+                # The merged chord runs from the run start to the candidate. Every
+                # earlier end point lies within tolerance of it when the candidate's
+                # direction is inside the cone they allow and it reaches at least
+                # as far as any of them, so each append is checked in O(1).
+                candidate = _scaled_point(pos['B'], pos['Y'], pos['Z'], run["ref"])
+                axis, half_angle, reach = _direction_cone(candidate, run["start"], tolerance)
+                cone = None
+                if (run["cmd"] == cmd
+                        and _same_feed(run["feed"], feed)
+                        and run["extruding"] == extruding
+                        and len(run["lines"]) < MAX_MERGED_MOVES
+                        and abs(flow - run["flow"]) <= FLOW_TOLERANCE * abs(run["flow"])
+                        and reach >= run["reach"]
+                        and (axis is None or run["axis"] is None
+                             or _angle_between(axis, run["axis"]) <= run["half_angle"])):
+                    cone = _intersect_cones(run["axis"], run["half_angle"], axis, half_angle)
+                if cone is not None:
+                    run["axis"], run["half_angle"] = cone
+                    run["reach"] = reach
+                    run["lines"].append(line)
+                    run["words"].update({k: v for k, v in words.items() if k in 'BYZE'})
+                    run["de"] += de
+                    continue
+                flush(out)
+
+            axis, half_angle, reach = _direction_cone(b, a, tolerance)
+            run = {
+                "cmd": cmd,
+                "f": f,
+                "feed": feed,
+                "extruding": extruding,
+                "flow": flow,
+                "ref": ref,
+                "start": a,
+                "axis": axis,
+                "half_angle": half_angle,
+                "reach": reach,
+                "lines": [line],
+                "words": {k: v for k, v in words.items() if k in 'BYZE'},
+                "de": de,
+            }
+
+        flush(out)
+
+    reduction = 100.0 * (1 - stats["moves_out"] / stats["moves_in"]) if stats["moves_in"] else 0.0
+    print(f"Compacted G-code saved to: {output_path} "
+          f"({stats['moves_in']} -> {stats['moves_out']} moves, {reduction:.1f}% fewer)")
+    instrumentation.count("compact_moves_in", stats["moves_in"])
+    instrumentation.count("compact_moves_out", stats["moves_out"])
+    return stats
+
+
+def _toolpath_points(path):
+    # Distinct successive B/Y/Z positions reached by G0/G1 moves
+    pos = [0.0, 0.0, 0.0]
+    last = None
+    with open(path, 'r') as f:
+        for line in f:
+            stripped = line.strip()
+            if not move_re.match(stripped):
+                continue
+            words = dict(word_re.findall(stripped.split(';')[0]))
+            for i, axis in enumerate(('B', 'Y', 'Z')):
+                if axis in words:
+                    pos[i] = float(words[axis])
+            point = tuple(pos)
+            if point != last:
+                last = point
+                yield point
+
+
+def compare_toolpaths(original_path, compacted_path, spacing=0.1):
+    """
+    Resample the original toolpath every `spacing` mm and return the largest
+    distance (mm, B measured on the surface) from the compacted toolpath.
+    Both files are streamed.
+    """
+    original = _toolpath_points(original_path)
+    compacted = _toolpath_points(compacted_path)
+    o_prev = next(original, None)
+    c_prev = next(compacted, None)
+    c_next = next(compacted, None)
+    if o_prev != c_prev:
+        raise ValueError("Toolpaths do not start at the same position.")
+
+    max_dev = 0.0
+    for o in original:
+        if c_next is None:
+            raise ValueError("Compacted toolpath ends before the original.")
+        ref = abs(c_prev[2])
+        seg_a = _scaled_point(*c_prev, ref)
+        seg_b = _scaled_point(*c_next, ref)
+        a = _scaled_point(*o_prev, ref)
+        b = _scaled_point(*o, ref)
+        samples = max(1, math.ceil(math.dist(a, b) / spacing))
+        for i in range(samples + 1):
+            t = i / samples
+            p = tuple(a[k] + (b[k] - a[k]) * t for k in range(3))
+            max_dev = max(max_dev, _point_segment_distance(p, seg_a, seg_b))
+        if o == c_next:
+            c_prev, c_next = c_next, next(compacted, None)
+        o_prev = o
+
+    return max_dev
@@ -5,12 +5,13 @@ from stl_editor import STLEditor
 from gcode_visualiser import parse_cylindrical_gcode
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python gcode_viewer_launcher.py <gcode_file>")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) < 1:
+        print("Usage: python gcode_viewer_launcher.py <gcode_file> [--coarse]")
         sys.exit(1)
 
-    gcode_path = sys.argv[1]
-    moves = parse_cylindrical_gcode(gcode_path)
+    gcode_path = args[0]
+    moves = parse_cylindrical_gcode(gcode_path, coarse="--coarse" in sys.argv)
 
     app = QtWidgets.QApplication([])
     viewer = STLEditor(stl_path="")  # Dummy STL
@@ -2,6 +2,8 @@ import re
 import math
 import plotly.graph_objects as go
 
+import instrumentation
+
 g1_re = re.compile(r'G1\b')
 coord_re = re.compile(r'([BYZE])(-?\d+\.?\d*)')
 
@@ -10,8 +12,46 @@ coord_re = re.compile(r'([BYZE])(-?\d+\.?\d*)')
 g1_re = re.compile(r'^\s*G1\b')  # Match lines starting with G1
 coord_re = re.compile(r'([BYZE])([-+]?[0-9]*\.?[0-9]+)')  # Extract B, Y, Z, E values
 
-def parse_cylindrical_gcode(file_path):
+# Maximum allowed distance (mm) between an interpolated chord and the true arc
+# of a B-axis move. The coarse tolerance is meant for quick overview renders.
+CHORD_TOLERANCE = 0.02
+COARSE_CHORD_TOLERANCE = 0.5
+# Upper bound on a single interpolation step so long moves never collapse
+# into a degenerate chord on very small radii
+MAX_STEP_DEG = 45.0
+
+
+def arc_steps(delta_B, radius, tolerance=CHORD_TOLERANCE):
+    """
+    Number of chords needed to follow a rotation of delta_B degrees at the
+    given radius without the chord sagitta r * (1 - cos(dtheta / 2))
+    exceeding tolerance.
+    """
+    radius = abs(radius)
+    if delta_B == 0 or radius == 0:
+        return 1
+    if tolerance >= radius:
+        max_step = math.radians(MAX_STEP_DEG)
+    else:
+        max_step = min(2 * math.acos(1 - tolerance / radius), math.radians(MAX_STEP_DEG))
+    return max(1, math.ceil(abs(math.radians(delta_B)) / max_step))
+
+
+@instrumentation.traced("parse_cylindrical_gcode")
+def parse_cylindrical_gcode(file_path, tolerance=None, coarse=False):
+    """
+    Parse B/Y/Z/E G-code into straight 3D segments for display.
+
+    Rotary moves are split into chords so the deviation from the true arc
+    stays within tolerance (mm), computed from the move radius Z. When no
+    tolerance is given, coarse selects COARSE_CHORD_TOLERANCE over
+    CHORD_TOLERANCE.
+    """
+    if tolerance is None:
+        tolerance = COARSE_CHORD_TOLERANCE if coarse else CHORD_TOLERANCE
+
     moves = []
+    gcode_moves = 0
     B = Y = Z = E = 0.0
 
     with open(file_path, 'r') as f:
@@ -28,41 +68,37 @@ def parse_cylindrical_gcode(file_path):
             Z = float(parts.get('Z', Z))
             E = float(parts.get('E', E))
 
-            # Determine number of steps if B changes significantly
+            # Radius varies linearly over the move, so the larger end bounds the sagitta.
+            # When it varies the path is a spiral r = r0 + k * theta, which bends away
+            # from its chords like a circle of radius (r^2 + 2k^2) / sqrt(r^2 + k^2).
             delta_B = B - prev_B
-            steps = max(1, int(abs(delta_B) / 3.0))
-            
+            radius = max(abs(prev_Z), abs(Z))
+            if delta_B and Z != prev_Z:
+                k = (Z - prev_Z) / math.radians(delta_B)
+                radius = (radius ** 2 + 2 * k ** 2) / math.sqrt(radius ** 2 + k ** 2)
+            steps = arc_steps(delta_B, radius, tolerance)
+            extruding = E > prev_E
+
+            x0 = prev_Z * math.cos(math.radians(prev_B))
+            z0 = prev_Z * math.sin(math.radians(prev_B))
+            y0 = prev_Y
+
             for step in range(1, steps + 1):
-                # Interpolated parameters
-                interp_B = prev_B + (delta_B * step / steps)
-                interp_theta = math.radians(interp_B)
-
-                # Linear interpolation for Z, Y, and E
-                interp_Z = prev_Z + (Z - prev_Z) * step / steps
-                interp_Y = prev_Y + (Y - prev_Y) * step / steps
-                interp_E = prev_E + (E - prev_E) * step / steps
-
-                # Previous step (either actual prev or last interpolated)
-                if step == 1:
-                    prev_theta = math.radians(prev_B)
-                    prev_r = prev_Z
-                    prev_y = prev_Y
-                else:
-                    prev_theta = math.radians(prev_B + (delta_B * (step - 1) / steps))
-                    prev_r = prev_Z + (Z - prev_Z) * (step - 1) / steps
-                    prev_y = prev_Y + (Y - prev_Y) * (step - 1) / steps
-
-                x0 = prev_r * math.cos(prev_theta)
-                z0 = prev_r * math.sin(prev_theta)
-                y0 = prev_y
+                t = step / steps
+                interp_theta = math.radians(prev_B + delta_B * t)
+                interp_Z = prev_Z + (Z - prev_Z) * t
+                interp_Y = prev_Y + (Y - prev_Y) * t
 
                 x1 = interp_Z * math.cos(interp_theta)
                 z1 = interp_Z * math.sin(interp_theta)
                 y1 = interp_Y
 
-                extruding = interp_E > prev_E + (E - prev_E) * (step - 1) / steps
                 moves.append(((x0, y0, z0), (x1, y1, z1), extruding))
+                x0, y0, z0 = x1, y1, z1
+            gcode_moves += 1
 
+    instrumentation.count("gcode_moves_parsed", gcode_moves)
+    instrumentation.count("segments_generated", len(moves))
     return moves
 
 
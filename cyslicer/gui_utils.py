@@ -7,9 +7,13 @@ import subprocess
 import sys
 
 from pathlib import Path
-from stl_utils import unwrap_and_repair_stl
-from slicer_utils import slice_stl_with_prusaslicer
-from gcode_utils import modify_gcode
+import instrumentation
+from config_utils import load_ini
+from pipeline import PRUSASLICER_PATH, slice_stl_job
+from plate_utils import slice_plate
+from gcode_estimator import format_duration
+from slicing_service import service_available, run_job
+from mesh_ipc import MeshListener
 from stl_editor import STLEditor
 from gcode_visualiser import parse_cylindrical_gcode, plot_gcode_plotly
 
@@ -46,39 +50,9 @@ REVERSE_KEYS = {v: k for k, v in PARAM_KEYS.items()}
 
 entries = {}
 
-def update_prusa_config(json_path, ini_path, output_path=None):
-    import json
-
-    EXCLUDE_KEYS = {"stl_file","ini_file", "bed_radius"}
-
-    with open(json_path, 'r') as f:
-        new_params = json.load(f)
-
-    with open(ini_path, 'r') as f:
-        lines = f.readlines()
-
-    updated_config = {}
-    for line in lines:
-        if '=' in line and not line.strip().startswith('#'):
-            key, value = line.split('=', 1)
-            updated_config[key.strip()] = value.strip()
-
-    # Update only relevant keys
-    for key, new_value in new_params.items():
-        if key in EXCLUDE_KEYS:
-            continue
-        updated_config[key] = str(new_value)
-
-    updated_lines = [f"{key} = {value}\n" for key, value in updated_config.items()]
-
-    if not output_path:
-        output_path = ini_path
-
-    with open(output_path, 'w') as f:
-        f.writelines(updated_lines)
-
-    print(f"Config updated and saved to: {output_path}")
-
+# Channel to STL editor processes and the last mesh they sent us
+editor_channel = None
+edited_mesh = None
 
 def browse_ini():
     path = filedialog.askopenfilename(
@@ -91,19 +65,12 @@ def browse_ini():
 
 def load_config_into_fields(path):
     try:
-        with open(path, 'r') as f:
-            lines = f.readlines()
-
-        config_dict = {}
-        for line in lines:
-            if '=' in line and not line.strip().startswith('#'):
-                key, value = line.split('=', 1)
-                config_dict[key.strip()] = value.strip()
+        config = load_ini(path)
 
         for param_key, label in PARAM_KEYS.items():
-            if param_key in config_dict:
+            if param_key in config:
                 entries[label].delete(0, tk.END)
-                entries[label].insert(0, config_dict[param_key])
+                entries[label].insert(0, config[param_key])
 
     except Exception as e:
         messagebox.showerror("Error", f"Failed to read config file:\n{e}")
@@ -118,35 +85,57 @@ def slice_and_process():
         with open(user_params_path, 'r') as f:
             params = json.load(f)
 
-        stl_path = Path(params["stl_file"])
-        bed_radius = float(params["bed_radius"])
+        # Step 3: Run the slicing pipeline, on the warm service when it is running.
+        # A mesh received from the editor only lives in this process, so it is sliced here.
+        result = None
+        if edited_mesh is not None and edited_mesh["source"] == params["stl_file"]:
+            result = slice_stl_job(params, base_dir, compact=compact_var.get(),
+                                   mesh_data=(edited_mesh["vertices"], edited_mesh["faces"]))
+        elif service_available():
+            try:
+                result = run_job("slice", params, options={"base_dir": str(base_dir), "compact": compact_var.get()},
+                                 on_progress=lambda stage: print(f" {stage}..."))
+            except OSError as e:
+                print(f"Slicing service unresponsive ({e}); slicing in this process.")
+        if result is None:
+            result = slice_stl_job(params, base_dir, compact=compact_var.get())
+        updated_gcode = result["gcode"]
+        instrumentation.write_reports()
 
-        stl_name = stl_path.stem.lower().replace(" ", "_")
-        stl_dir = base_dir / "stl"
-        gcode_dir = base_dir / "gcode"
-        temp_dir = base_dir / "temp"
-        config_path = Path(params["ini_file"])
-        prusaslicer_path = Path(r"C:\Program Files\Prusa3D\PrusaSlicer\prusa-slicer.exe")
+        from tkinter import messagebox
+        messagebox.showinfo("Success", f"Slicing complete!\nOutput: {updated_gcode}\n"
+                                       f"Estimated print time: {format_duration(result['total_time'])}\n"
+                                       f"Filament: {result['filament_mm'] / 1000:.2f} m")
 
-        unwrapped_stl = stl_dir / f"unwrapped_{stl_name}.stl"
-        raw_gcode = gcode_dir / f"unwrapped_{stl_name}.gcode"
-        updated_gcode = gcode_dir / f"{stl_name}_updated.gcode"
+    except Exception as e:
+        from tkinter import messagebox
+        messagebox.showerror("Slicing Error", f"An error occurred during slicing:\n{e}")
 
-        gcode_dir.mkdir(exist_ok=True)
-        temp_dir.mkdir(exist_ok=True)
+def slice_plate_and_process():
+    stl_files = filedialog.askopenfilenames(
+        filetypes=[("STL files", "*.stl")],
+        title="Select the STL files for one plate"
+    )
+    if not stl_files:
+        return
 
-        # Step 3: Run the slicing pipeline
-        unwrap_and_repair_stl(stl_path, unwrapped_stl, debug_temp_path=temp_dir)
-        update_prusa_config(user_params_path, config_path)
-        slice_stl_with_prusaslicer(prusaslicer_path, config_path, unwrapped_stl, raw_gcode)
-        modify_gcode(raw_gcode, updated_gcode, radius=bed_radius)
+    try:
+        save_parameters()
 
-        from tkinter import messagebox
-        messagebox.showinfo("Success", f"Slicing complete!\nOutput: {updated_gcode}")
+        base_dir = Path(__file__).resolve().parent
+        with open(base_dir / "user_parameters.json", 'r') as f:
+            params = json.load(f)
+
+        result = slice_plate(stl_files, params, PRUSASLICER_PATH,
+                             base_dir / "temp" / "plate", base_dir / "gcode", compare=compare_plate_var.get())
+        summary = f"Plate slicing complete!\nOutput: {result['gcode']}\nPlate sliced in {result['plate_time']:.1f} s"
+        if "gain" in result:
+            summary += (f"\nSeparate slicing took {result['separate_time']:.1f} s "
+                        f"({result['gain']:.2f}x plate throughput gain)")
+        messagebox.showinfo("Success", summary)
 
     except Exception as e:
-        from tkinter import messagebox
-        messagebox.showerror("Slicing Error", f"An error occurred during slicing:\n{e}")
+        messagebox.showerror("Slicing Error", f"An error occurred during plate slicing:\n{e}")
 
 def preview_stl(file_path):
     try:
@@ -198,17 +187,35 @@ def save_parameters():
 
 
 def on_stl_saved(new_path):
+    global edited_mesh
+    edited_mesh = None
     stl_var.set(new_path)
     messagebox.showinfo("STL Saved", f"STL saved and updated:\n{new_path}")
 
+def poll_editor_channel():
+    global edited_mesh
+    if editor_channel is not None:
+        for message in editor_channel.poll():
+            if message["type"] == "mesh":
+                edited_mesh = message
+                stl_var.set(message["source"])
+                messagebox.showinfo("STL Editor", f"Edited mesh received for:\n{message['source']}")
+            elif message["type"] == "path":
+                on_stl_saved(message["path"])
+    root.after(200, poll_editor_channel)
+
 def launch_stl_editor():
+    global editor_channel
     stl_file = stl_var.get()
     if not stl_file:
         messagebox.showerror("No STL File", "Please select an STL file first.")
         return
 
     try:
-        subprocess.Popen([sys.executable, "-m", "stl_editor_launcher", stl_file])
+        if editor_channel is None:
+            editor_channel = MeshListener()
+        subprocess.Popen([sys.executable, "-m", "stl_editor_launcher", stl_file,
+                          "--channel", editor_channel.argument])
     except Exception as e:
         messagebox.showerror("STL Editor Error", f"Failed to launch editor:\n{e}")
 
@@ -219,6 +226,8 @@ root.title("3D Printing Parameters")
 
 stl_var = tk.StringVar()
 ini_path_var = tk.StringVar()
+compact_var = tk.BooleanVar(value=False)
+compare_plate_var = tk.BooleanVar(value=False)
 # Load INI Section
 tk.Label(root, text="Config INI File:").grid(row=0, column=0, sticky="e")
 ini_entry = tk.Entry(root, textvariable=ini_path_var, width=50)
@@ -260,6 +269,19 @@ tk.Button(root, text="View G-code", command=browse_and_view_gcode).grid(
     row=start_row + len(PARAM_KEYS) + 2, column=2, pady=10
 )
 
+tk.Button(root, text="Slice Plate", command=slice_plate_and_process).grid(
+    row=start_row + len(PARAM_KEYS) + 2, column=3, pady=10
+)
+
+tk.Checkbutton(root, text="Compact toolpath", variable=compact_var).grid(
+    row=start_row + len(PARAM_KEYS) + 1, column=2, sticky="w"
+)
+
+tk.Checkbutton(root, text="Compare with separate slicing", variable=compare_plate_var).grid(
+    row=start_row + len(PARAM_KEYS) + 1, column=3, sticky="w"
+)
+
+root.after(200, poll_editor_channel)
 
 root.mainloop()
 
@@ -0,0 +1,176 @@
+# Lightweight pipeline instrumentation: stage spans, counters and peak RSS.
+#
+# Off by default. Set CYSLICER_TRACE=<path prefix> (or run main.py with
+# --trace <path prefix>) to record; <prefix>.json and a Chrome trace
+# <prefix>.trace.json (chrome://tracing or Perfetto) are written by
+# write_reports() and at exit. Child processes (service workers, forked or
+# spawned) inherit the setting and write <prefix>.<pid>.json instead. When
+# off, span() hands back a shared no-op context manager and count() returns
+# immediately.
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+
+ENV_VAR = "CYSLICER_TRACE"
+OWNER_VAR = "CYSLICER_TRACE_OWNER"   # pid of the process that writes <prefix>.json
+
+_enabled = False
+_output = None
+_owner_pid = None
+_lock = threading.Lock()
+_spans = []
+_counters = {}
+_t0 = time.perf_counter()
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enable(output=None):
+    """Start recording; output is the path prefix for write_reports()."""
+    global _enabled, _output, _owner_pid
+    if not _enabled:
+        atexit.register(write_reports)
+    _enabled = True
+    _output = output
+    # Passed on through the environment so spawned children, which run
+    # enable() again on import, still know they are not the owner
+    if output:
+        os.environ[ENV_VAR] = output
+    os.environ.setdefault(OWNER_VAR, str(os.getpid()))
+    _owner_pid = int(os.environ[OWNER_VAR])
+
+
+def is_enabled():
+    return _enabled
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None if unknown."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    except (ImportError, AttributeError, OSError):
+        pass
+    return None
+
+
+@contextmanager
+def _span(name, args):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        record = {"name": name, "start": start - _t0, "duration": end - start,
+                  "pid": os.getpid(), "tid": threading.get_ident(),
+                  "peak_rss_mb": peak_rss_mb(), "args": args}
+        with _lock:
+            _spans.append(record)
+
+
+def span(name, **args):
+    """Context manager timing one stage; args are stored with the span."""
+    if not _enabled:
+        return _NO_SPAN
+    return _span(name, args)
+
+
+def traced(name):
+    """Decorator recording every call of a function as a span."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Add value to a named counter."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def reset():
+    """Drop recorded spans and counters, e.g. those a forked worker inherited."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def snapshot():
+    with _lock:
+        return {"spans": list(_spans), "counters": dict(_counters), "peak_rss_mb": peak_rss_mb()}
+
+
+def export_json(path):
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=4, default=str)
+
+
+def export_chrome_trace(path):
+    """Write spans as complete ('X') events and counters as one 'C' event."""
+    data = snapshot()
+    events = [{"name": s["name"], "ph": "X", "ts": s["start"] * 1e6, "dur": s["duration"] * 1e6,
+               "pid": s["pid"], "tid": s["tid"],
+               "args": dict(s["args"], peak_rss_mb=s["peak_rss_mb"])} for s in data["spans"]]
+    end = max((s["start"] + s["duration"] for s in data["spans"]), default=0.0)
+    for name, value in data["counters"].items():
+        events.append({"name": name, "ph": "C", "ts": end * 1e6, "pid": os.getpid(), "args": {name: value}})
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+def write_reports():
+    """Write the JSON and Chrome trace reports if recording to a path."""
+    if not _enabled or not _output:
+        return
+    # Worker processes inherit the setting; give them their own files
+    prefix = _output if os.getpid() == _owner_pid else f"{_output}.{os.getpid()}"
+    export_json(f"{prefix}.json")
+    export_chrome_trace(f"{prefix}.trace.json")
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
@@ -1,7 +1,14 @@
-from gui_utils import launch_gui
+import sys
+
+import instrumentation
 
 def main():
+    # --trace <path prefix> records pipeline timings, like CYSLICER_TRACE
+    if "--trace" in sys.argv[1:-1]:
+        instrumentation.enable(sys.argv[sys.argv.index("--trace") + 1])
+
     # Just launch the GUI; slicing now happens from the GUI itself
+    from gui_utils import launch_gui
     launch_gui()
 
 if __name__ == "__main__":
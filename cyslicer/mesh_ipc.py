@@ -0,0 +1,158 @@
+import os
+import queue
+import secrets
+import threading
+import time
+import numpy as np
+
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Listener, Client
+from multiprocessing.shared_memory import SharedMemory
+
+ACK_TIMEOUT = 5.0
+
+
+def _attach(name):
+    # Attach without letting this process's resource tracker claim the block;
+    # the publisher owns it and unlinks it once the consumer has copied it
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def read_mesh(message):
+    """Copy vertices and faces out of the shared block named in a mesh message."""
+    n_vertices, n_faces = message["n_vertices"], message["n_faces"]
+    shm = _attach(message["shm"])
+    try:
+        vertices = np.ndarray((n_vertices, 3), dtype=np.float64, buffer=shm.buf).copy()
+        faces = np.ndarray((n_faces, 3), dtype=np.int64, buffer=shm.buf,
+                           offset=vertices.nbytes).copy()
+    finally:
+        shm.close()
+    return vertices, faces
+
+
+class MeshListener:
+    """
+    GUI side of the editor channel.
+
+    Accepts editor connections on localhost in a background thread and
+    queues their messages; meshes are copied out of shared memory before
+    the editor is told it may release them. Call poll() from the GUI loop.
+    """
+
+    def __init__(self):
+        self.authkey = secrets.token_bytes(16)
+        self._listener = Listener(("127.0.0.1", 0), authkey=self.authkey)
+        self._messages = queue.Queue()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    @property
+    def argument(self):
+        host, port = self._listener.address
+        return f"{host}:{port}:{self.authkey.hex()}"
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+    def _receive(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if message["type"] == "mesh":
+                    try:
+                        message["vertices"], message["faces"] = read_mesh(message)
+                    except (OSError, ValueError, TypeError) as e:
+                        # The block is gone or malformed; tell the editor and keep listening
+                        self._reply(conn, {"type": "nack", "shm": message["shm"], "error": str(e)})
+                        continue
+                    self._messages.put(message)
+                    self._reply(conn, {"type": "ack", "shm": message["shm"]})
+                else:
+                    self._messages.put(message)
+
+    @staticmethod
+    def _reply(conn, reply):
+        try:
+            conn.send(reply)
+        except OSError:
+            pass            # the editor has gone; the next recv ends the thread
+
+    def poll(self):
+        """Return the messages received since the last call."""
+        messages = []
+        while True:
+            try:
+                messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        self._listener.close()
+
+
+class MeshPublisher:
+    """Editor side of the channel, connected from a MeshListener argument."""
+
+    def __init__(self, argument):
+        host, port, key = argument.rsplit(":", 2)
+        self._conn = Client((host, int(port)), authkey=bytes.fromhex(key))
+
+    def publish(self, vertices, faces, transform, source=None):
+        """
+        Place the mesh in a new shared memory block and hand it to the GUI.
+        The block is unlinked once the GUI acknowledges its copy. Raises
+        TimeoutError if no reply arrives within ACK_TIMEOUT and
+        RuntimeError if the GUI could not read the block.
+        """
+        vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+        faces = np.ascontiguousarray(faces, dtype=np.int64)
+        shm = SharedMemory(create=True, size=max(vertices.nbytes + faces.nbytes, 1))
+        try:
+            np.ndarray(vertices.shape, dtype=np.float64, buffer=shm.buf)[:] = vertices
+            np.ndarray(faces.shape, dtype=np.int64, buffer=shm.buf, offset=vertices.nbytes)[:] = faces
+            self._conn.send({
+                "type": "mesh",
+                "shm": shm.name,
+                "n_vertices": len(vertices),
+                "n_faces": len(faces),
+                "transform": np.asarray(transform, dtype=float).tolist(),
+                "source": source,
+            })
+            reply = self._wait_for_reply(shm.name)
+            if reply["type"] != "ack":
+                raise RuntimeError(f"The slicer could not read the mesh: {reply.get('error')}")
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _wait_for_reply(self, name):
+        # Replies to earlier meshes that arrived after their timeout are skipped
+        deadline = time.monotonic() + ACK_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._conn.poll(remaining):
+                raise TimeoutError(f"The slicer did not acknowledge the mesh within {ACK_TIMEOUT:g} s.")
+            reply = self._conn.recv()
+            if reply.get("shm") == name:
+                return reply
+
+    def send_path(self, path):
+        """Tell the GUI about an STL saved to disk."""
+        self._conn.send({"type": "path", "path": str(path)})
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,81 @@
+import math
+import shutil
+from pathlib import Path
+
+import instrumentation
+
+from config_utils import load_ini
+from stl_utils import unwrap_and_repair_stl
+from slicer_utils import slice_stl_with_prusaslicer
+from gcode_utils import modify_gcode, compact_gcode, compare_toolpaths
+from gcode_estimator import estimate_print, limits_from_ini
+
+PRUSASLICER_PATH = Path(r"C:\Program Files\Prusa3D\PrusaSlicer\prusa-slicer.exe")
+COMPACT_TOLERANCE = 0.01    # mm a compacted toolpath may stray from the converted one
+
+
+@instrumentation.traced("slice_stl_job")
+def slice_stl_job(params, base_dir, prusaslicer_path=PRUSASLICER_PATH, compact=False, progress=None,
+                  mesh_data=None):
+    """
+    Run the full pipeline for the STL in params: unwrap and repair, write
+    the job INI, slice with PrusaSlicer, convert to B/Y/Z and estimate.
+
+    progress, if given, is called with the name of each stage as it starts.
+    mesh_data (vertices, faces) replaces loading params["stl_file"].
+    Returns a dict with the converted G-code path, print time and filament.
+    """
+    report = progress or (lambda stage: None)
+    base_dir = Path(base_dir)
+
+    stl_path = Path(params["stl_file"])
+    bed_radius = float(params["bed_radius"])
+
+    stl_name = stl_path.stem.lower().replace(" ", "_")
+    stl_dir = base_dir / "stl"
+    gcode_dir = base_dir / "gcode"
+    temp_dir = base_dir / "temp"
+    config_path = Path(params["ini_file"])
+
+    unwrapped_stl = stl_dir / f"unwrapped_{stl_name}.stl"
+    raw_gcode = gcode_dir / f"unwrapped_{stl_name}.gcode"
+    updated_gcode = gcode_dir / f"{stl_name}_updated.gcode"
+
+    gcode_dir.mkdir(exist_ok=True)
+    temp_dir.mkdir(exist_ok=True)
+
+    report("unwrap")
+    unwrap_and_repair_stl(stl_path, unwrapped_stl, debug_temp_path=temp_dir, mesh_data=mesh_data)
+
+    report("config")
+    with instrumentation.span("config"):
+        job_config_path = load_ini(config_path).with_overrides(params).write_job_ini(temp_dir / stl_name)
+    print(f"Job config saved to: {job_config_path}")
+
+    report("slice")
+    slice_stl_with_prusaslicer(prusaslicer_path, job_config_path, unwrapped_stl, raw_gcode)
+
+    report("convert")
+    if compact:
+        converted_gcode = temp_dir / f"{stl_name}_converted.gcode"
+        modify_gcode(raw_gcode, converted_gcode, radius=bed_radius)
+        compact_gcode(converted_gcode, updated_gcode, tolerance=COMPACT_TOLERANCE)
+        # The distance to a straight piece is largest at its ends, so comparing
+        # end points alone (no resampling) gives the exact maximum deviation
+        with instrumentation.span("verify_compaction"):
+            deviation = compare_toolpaths(converted_gcode, updated_gcode, spacing=math.inf)
+        if deviation > COMPACT_TOLERANCE * (1 + 1e-6):
+            print(f"Compacted toolpath deviates {deviation:.4f} mm; keeping the uncompacted G-code.")
+            shutil.copyfile(converted_gcode, updated_gcode)
+    else:
+        modify_gcode(raw_gcode, updated_gcode, radius=bed_radius)
+
+    report("estimate")
+    with instrumentation.span("estimate"):
+        estimate = estimate_print(updated_gcode, limits_from_ini(config_path))
+
+    return {
+        "gcode": str(updated_gcode),
+        "total_time": estimate["total_time"],
+        "filament_mm": estimate["filament_mm"],
+    }
@@ -0,0 +1,147 @@
+import json
+import math
+import sys
+import time
+import numpy as np
+import trimesh
+
+from pathlib import Path
+from config_utils import load_ini
+from stl_utils import unwrap_and_repair_stl
+from slicer_utils import slice_stl_with_prusaslicer
+from gcode_utils import modify_gcode
+
+
+def angular_extent(vertices):
+    """
+    Smallest arc (start, span) in radians covering the vertices around the
+    Y axis, using the same theta = atan2(x, z) convention as unwrap_vertex.
+    Parts that straddle the 0/2pi seam get a start near 2pi.
+    """
+    theta = np.sort(np.mod(np.arctan2(vertices[:, 0], vertices[:, 2]), 2 * math.pi))
+    gaps = np.diff(np.concatenate((theta, [theta[0] + 2 * math.pi])))
+    widest = int(np.argmax(gaps))
+    start = theta[(widest + 1) % len(theta)]
+    return start, 2 * math.pi - gaps[widest]
+
+
+def pack_parts(meshes, radius, gap=2.0):
+    """
+    Shelf-pack part footprints on the unwrapped theta/Y strip.
+
+    Each footprint is the part's angular span by its Y extent; shelves run
+    around the full 2*pi of the cylinder and stack along Y. gap is in mm
+    measured at radius. Returns a list of (rotation, y_shift) per mesh.
+    """
+    gap_angle = gap / radius
+    footprints = []
+    for i, m in enumerate(meshes):
+        start, span = angular_extent(m.vertices)
+        y_min, y_max = m.vertices[:, 1].min(), m.vertices[:, 1].max()
+        if span + 2 * gap_angle > 2 * math.pi:
+            raise ValueError(f"Part {i} wraps the whole cylinder and cannot share a plate.")
+        footprints.append((i, start, span, y_min, y_max - y_min))
+
+    placements = [None] * len(meshes)
+    shelf_y = 0.0
+    shelf_height = 0.0
+    cursor = gap_angle
+    # First fit by decreasing height keeps shelves tight
+    for i, start, span, y_min, height in sorted(footprints, key=lambda p: -p[4]):
+        if cursor + span + gap_angle > 2 * math.pi:
+            shelf_y += shelf_height + gap
+            shelf_height = 0.0
+            cursor = gap_angle
+        placements[i] = (float(cursor - start), float(shelf_y - y_min))
+        shelf_height = max(shelf_height, height)
+        cursor += span + gap_angle
+
+    return placements
+
+
+def build_plate(stl_paths, output_path, radius, gap=2.0):
+    """Place all parts around the cylinder and export them as one STL."""
+    meshes = [trimesh.load_mesh(str(p), force='mesh') for p in stl_paths]
+    placements = pack_parts(meshes, radius, gap)
+
+    placed = []
+    for m, (rotation, y_shift) in zip(meshes, placements):
+        # Rotating about +Y by phi moves theta = atan2(x, z) forward by phi
+        transform = trimesh.transformations.rotation_matrix(rotation, [0, 1, 0])
+        transform[1, 3] = y_shift
+        placed.append(m.copy().apply_transform(transform))
+
+    plate = trimesh.util.concatenate(placed)
+    plate.export(str(output_path))
+    print(f"Plate with {len(meshes)} parts saved to: {output_path}")
+    return output_path
+
+
+def _slice_job(prusaslicer_path, config_path, stl_path, name, radius, work_dir, gcode_dir):
+    unwrapped_stl = work_dir / f"unwrapped_{name}.stl"
+    raw_gcode = work_dir / f"unwrapped_{name}.gcode"
+    updated_gcode = gcode_dir / f"{name}_updated.gcode"
+    unwrap_and_repair_stl(Path(stl_path), unwrapped_stl, debug_temp_path=work_dir)
+    slice_stl_with_prusaslicer(prusaslicer_path, config_path, unwrapped_stl, raw_gcode)
+    modify_gcode(raw_gcode, updated_gcode, radius=radius)
+    return updated_gcode
+
+
+def slice_plate(stl_paths, params, prusaslicer_path, work_dir, gcode_dir, gap=2.0, compare=False):
+    """
+    Pack several STLs that share radius and layer settings onto one plate,
+    slice it in a single PrusaSlicer run and convert it once.
+
+    With compare, every part is also sliced on its own and the wall-clock
+    ratio between the separate runs and the plate run is reported.
+    Returns a dict with the converted plate G-code path and the timings
+    (separate_time and gain only with compare).
+    """
+    work_dir = Path(work_dir)
+    gcode_dir = Path(gcode_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    gcode_dir.mkdir(parents=True, exist_ok=True)
+    radius = float(params["bed_radius"])
+
+    config_path = load_ini(params["ini_file"]).with_overrides(params).write_job_ini(work_dir)
+    names = [Path(p).stem.lower().replace(" ", "_") for p in stl_paths]
+    plate_name = "plate_" + "_".join(names)[:60]
+
+    start = time.perf_counter()
+    plate_stl = build_plate(stl_paths, work_dir / f"{plate_name}.stl", radius, gap)
+    plate_gcode = _slice_job(prusaslicer_path, config_path, plate_stl, plate_name, radius, work_dir, gcode_dir)
+    plate_time = time.perf_counter() - start
+    print(f"Plate of {len(stl_paths)} parts sliced in {plate_time:.1f} s")
+    result = {"gcode": plate_gcode, "plate_time": plate_time}
+
+    if compare:
+        start = time.perf_counter()
+        for stl_path, name in zip(stl_paths, names):
+            _slice_job(prusaslicer_path, config_path, stl_path, name, radius, work_dir, work_dir)
+        result["separate_time"] = time.perf_counter() - start
+        result["gain"] = result["separate_time"] / plate_time
+        print(f"Separate slicing took {result['separate_time']:.1f} s; "
+              f"plate throughput gain {result['gain']:.2f}x")
+
+    return result
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--gap", "--prusaslicer"}
+    positional = [a for i, a in enumerate(args)
+                  if not a.startswith("--") and (i == 0 or args[i - 1] not in options)]
+    if len(positional) < 2:
+        print("Usage: python plate_utils.py <user_parameters.json> <stl_file> [<stl_file> ...] "
+              "[--gap MM] [--prusaslicer PATH] [--compare]")
+        sys.exit(1)
+
+    from pipeline import PRUSASLICER_PATH
+    with open(positional[0], 'r') as f:
+        params = json.load(f)
+    base_dir = Path(__file__).resolve().parent
+    gap = float(args[args.index("--gap") + 1]) if "--gap" in args else 2.0
+    slicer = Path(args[args.index("--prusaslicer") + 1]) if "--prusaslicer" in args else PRUSASLICER_PATH
+    result = slice_plate(positional[1:], params, slicer, base_dir / "temp" / "plate", base_dir / "gcode",
+                         gap=gap, compare="--compare" in args)
+    print(f"Plate G-code: {result['gcode']}")
@@ -1,6 +1,9 @@
 import subprocess
 from pathlib import Path
 
+import instrumentation
+
+@instrumentation.traced("prusaslicer")
 def slice_stl_with_prusaslicer(prusaslicer_path, config_path, stl_path, output_path):
     cmd = [
         str(prusaslicer_path),
@@ -11,6 +14,7 @@ def slice_stl_with_prusaslicer(prusaslicer_path, config_path, stl_path, output_p
     ]
     result = subprocess.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
+        instrumentation.count("slicer_failures")
         print("Slicing failed.\nSTDERR:", result.stderr)
     else:
         print("Slicing succeeded:", output_path)
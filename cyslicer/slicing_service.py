@@ -0,0 +1,448 @@
+import hmac
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import instrumentation
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+HEARTBEAT_INTERVAL = 1.0   # s between status lines on an idle event stream
+STREAM_TIMEOUT = 30.0      # s of silence after which a client gives up on the service
+# Lower numbers run first
+DEFAULT_PRIORITY = {"analyze": 0, "convert": 1, "slice": 2}
+
+BASE_DIR = Path(__file__).resolve().parent
+# Address and per-session token of the running service, readable only by this user
+SESSION_FILE = Path.home() / ".cyslicer" / "service.json"
+
+_progress_queue = None
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _warm_up(progress_queue):
+    # Runs once per worker process so every job finds the heavy modules loaded
+    global _progress_queue
+    _progress_queue = progress_queue
+    # A forked worker starts with a copy of the service's records
+    instrumentation.reset()
+    import numpy, trimesh, pyvista, stl, pymeshfix  # noqa: F401
+    import pipeline, gcode_utils, gcode_estimator  # noqa: F401
+
+
+def _ping():
+    return True
+
+
+def run_job_inline(job_id, job_type, params, options=None):
+    """
+    Execute one job in the current process and return its JSON-able result.
+    params are the job's inputs (for a slice, the user parameters that feed
+    the PrusaSlicer profile); options steer the service side of a slice
+    (base_dir, compact) and never reach the profile.
+    """
+    def report(stage):
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, stage))
+
+    try:
+        return _run_job(job_type, params, options or {}, report)
+    finally:
+        # Pool workers leave through os._exit, which skips the atexit export
+        instrumentation.write_reports()
+
+
+def _run_job(job_type, params, options, report):
+    if job_type == "slice":
+        from pipeline import slice_stl_job
+        return slice_stl_job(params, options.get("base_dir", BASE_DIR),
+                             compact=options.get("compact", False), progress=report)
+
+    if job_type == "convert":
+        from gcode_utils import modify_gcode
+        report("convert")
+        modify_gcode(params["input"], params["output"], radius=float(params["bed_radius"]))
+        return {"gcode": str(params["output"])}
+
+    if job_type == "analyze":
+        from gcode_estimator import estimate_print, limits_from_ini
+        report("estimate")
+        limits = limits_from_ini(params["ini_file"]) if params.get("ini_file") else None
+        estimate = estimate_print(params["gcode"], limits)
+        return {"total_time": estimate["total_time"], "filament_mm": estimate["filament_mm"],
+                "moves": estimate["moves"]}
+
+    raise ValueError(f"Unknown job type: {job_type}")
+
+
+# ---------------------------------------------------------------------------
+# Service side
+# ---------------------------------------------------------------------------
+
+class SlicingService:
+    """
+    Priority job queue in front of a pool of warm worker processes.
+
+    Jobs are only handed to the pool when a worker is free, so a queued
+    high-priority job overtakes lower-priority ones already waiting. If a
+    worker dies (a native crash in pymeshfix or VTK), the jobs on the pool
+    fail and a fresh pool takes over.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.jobs = {}
+        self.changed = threading.Condition()
+        self._queue = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._slots = threading.Semaphore(workers)
+        self._progress = multiprocessing.Queue()
+        self._pool_lock = threading.Lock()
+        self._pool = self._start_pool()
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True),
+                         threading.Thread(target=self._collect_progress, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job_type, params, priority=None, options=None):
+        if priority is None:
+            priority = DEFAULT_PRIORITY.get(job_type, 1)
+        # Checked before the job exists: one bad key in the heap breaks every later put
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)) or math.isnan(priority):
+            raise TypeError(f"priority must be a number, not {priority!r}")
+        job_id = str(next(self._ids))
+        with self.changed:
+            self.jobs[job_id] = {"id": job_id, "type": job_type, "status": "queued",
+                                 "priority": priority, "progress": [], "result": None,
+                                 "error": None, "submitted": time.time()}
+        self._queue.put((priority, int(job_id), job_id, job_type, params, options))
+        return job_id
+
+    def close(self):
+        """Stop taking jobs from the queue, shut the workers down and end the service threads."""
+        self._queue.put((-math.inf, 0, None, None, None, None))
+        self._slots.release()
+        with self._pool_lock:
+            pool = self._pool
+        pool.shutdown(wait=True, cancel_futures=True)
+        self._progress.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._progress.close()
+        self._progress.join_thread()
+
+    def _update(self, job_id, **fields):
+        with self.changed:
+            self.jobs[job_id].update(fields)
+            self.changed.notify_all()
+
+    def _start_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up,
+                                   initargs=(self._progress,))
+        for _ in range(self.workers):
+            pool.submit(_ping)
+        return pool
+
+    def _replace_pool(self, broken):
+        # Every job on a broken pool fails at once; only the first replaces it
+        with self._pool_lock:
+            if self._pool is broken:
+                print("A worker process died; starting new workers.")
+                broken.shutdown(wait=False)
+                self._pool = self._start_pool()
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            _, _, job_id, job_type, params, options = self._queue.get()
+            if job_id is None:
+                return
+            self._update(job_id, status="running", started=time.time())
+            with self._pool_lock:
+                pool = self._pool
+            try:
+                future = pool.submit(run_job_inline, job_id, job_type, params, options)
+            except BrokenProcessPool as e:
+                self._slots.release()
+                self._replace_pool(pool)
+                self._update(job_id, status="failed", error=f"Worker process died: {e}",
+                             finished=time.time())
+                continue
+            future.add_done_callback(lambda f, job_id=job_id, pool=pool: self._finish(job_id, pool, f))
+
+    def _finish(self, job_id, pool, future):
+        self._slots.release()
+        try:
+            self._update(job_id, status="done", result=future.result(), finished=time.time())
+        except BrokenProcessPool as e:
+            self._replace_pool(pool)
+            self._update(job_id, status="failed", error=f"Worker process died: {e}", finished=time.time())
+        except CancelledError:
+            self._update(job_id, status="failed", error="Service closed", finished=time.time())
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
+
+    def _collect_progress(self):
+        while True:
+            item = self._progress.get()
+            if item is None:
+                return
+            job_id, stage = item
+            with self.changed:
+                self.jobs[job_id]["progress"].append(stage)
+                self.changed.notify_all()
+
+    def snapshot(self, job_id):
+        with self.changed:
+            job = self.jobs.get(job_id)
+            return None if job is None else dict(job, progress=list(job["progress"]))
+
+    def wait_for_change(self, job_id, seen, timeout=1.0):
+        """Block until the job has more than `seen` progress entries or is finished."""
+        with self.changed:
+            self.changed.wait_for(
+                lambda: len(self.jobs[job_id]["progress"]) > seen
+                or self.jobs[job_id]["status"] in ("done", "failed"),
+                timeout=timeout)
+        return self.snapshot(job_id)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+    token = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _rejected(self):
+        # Browsers attach an Origin to cross-site requests; our own clients never do.
+        # Without the session token no other local page or user can reach the jobs.
+        if self.headers.get("Origin") is not None:
+            self._send_json(403, {"error": "cross-origin requests are not allowed"})
+            return True
+        if not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {self.token}"):
+            self._send_json(403, {"error": "missing or wrong session token"})
+            return True
+        return False
+
+    def do_POST(self):
+        if self._rejected():
+            return
+        if self.path != "/jobs":
+            return self._send_json(404, {"error": "not found"})
+        if self.headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+            return self._send_json(415, {"error": "expected application/json"})
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            job_id = self.service.submit(body["type"], body.get("params", {}), body.get("priority"),
+                                         body.get("options"))
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send_json(400, {"error": f"bad job request: {e}"})
+        self._send_json(202, {"id": job_id})
+
+    def do_GET(self):
+        if self._rejected():
+            return
+        parts = self.path.strip("/").split("/")
+        if parts == ["health"]:
+            return self._send_json(200, {"workers": self.service.workers,
+                                         "queued": self.service._queue.qsize()})
+        if len(parts) < 2 or parts[0] != "jobs" or self.service.snapshot(parts[1]) is None:
+            return self._send_json(404, {"error": "not found"})
+        if len(parts) == 2:
+            return self._send_json(200, self.service.snapshot(parts[1]))
+        if parts[2] == "events":
+            return self._stream_events(parts[1])
+        self._send_json(404, {"error": "not found"})
+
+    def _stream_events(self, job_id):
+        # Newline-delimited JSON, one line per progress stage and a final status line.
+        # A status line is sent when nothing changed so clients can tell a slow job
+        # from a dead service.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        seen = 0
+        while True:
+            job = self.service.wait_for_change(job_id, seen, timeout=HEARTBEAT_INTERVAL)
+            for stage in job["progress"][seen:]:
+                self.wfile.write(json.dumps({"stage": stage}).encode() + b"\n")
+            if len(job["progress"]) == seen and job["status"] not in ("done", "failed"):
+                self.wfile.write(json.dumps({"status": job["status"]}).encode() + b"\n")
+            seen = len(job["progress"])
+            self.wfile.flush()
+            if job["status"] in ("done", "failed"):
+                self.wfile.write(json.dumps(job).encode() + b"\n")
+                return
+
+
+def _write_session(host, port, token):
+    SESSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(SESSION_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({"host": host, "port": port, "token": token}, f)
+    os.chmod(SESSION_FILE, 0o600)
+
+
+def _session_token():
+    try:
+        with open(SESSION_FILE, 'r') as f:
+            return json.load(f)["token"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """HTTP server for a service with a fresh session token, published in SESSION_FILE."""
+    token = secrets.token_hex(16)
+    handler = type("Handler", (_Handler,), {"service": service, "token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    _write_session(*server.server_address[:2], token)
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+    service = SlicingService(workers)
+    server = make_server(service, host, port)
+    print(f"Slicing service listening on http://{host}:{port} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        SESSION_FILE.unlink(missing_ok=True)
+
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+def _url(path, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    return f"http://{host}:{port}{path}"
+
+
+def _request(path, host=DEFAULT_HOST, port=DEFAULT_PORT, body=None):
+    headers = {"Authorization": f"Bearer {_session_token()}"}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+        body = json.dumps(body).encode()
+    return urllib.request.Request(_url(path, host, port), data=body, headers=headers)
+
+
+def service_available(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    if _session_token() is None:
+        return False
+    try:
+        with urllib.request.urlopen(_request("/health", host, port), timeout=0.5):
+            return True
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def submit_job(job_type, params, priority=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=STREAM_TIMEOUT,
+               options=None):
+    request = _request("/jobs", host, port, {"type": job_type, "params": params, "priority": priority,
+                                             "options": options})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)["id"]
+
+
+def run_job(job_type, params, priority=None, on_progress=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+            timeout=STREAM_TIMEOUT, options=None):
+    """
+    Submit a job, follow its progress stream and return its result.
+    Raises RuntimeError if the job failed in the service, and OSError
+    (TimeoutError) if the service goes silent for timeout seconds.
+    """
+    job_id = submit_job(job_type, params, priority, host, port, timeout, options)
+    with urllib.request.urlopen(_request(f"/jobs/{job_id}/events", host, port), timeout=timeout) as response:
+        for line in response:
+            event = json.loads(line)
+            if "stage" in event:
+                if on_progress:
+                    on_progress(event["stage"])
+                continue
+            if event["status"] == "failed":
+                raise RuntimeError(event["error"])
+            if event["status"] == "done":
+                return event["result"]
+    raise ConnectionError(f"Slicing service closed the stream of job {job_id}.")
+
+
+def measure_latency(job_type, params, runs=3, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Compare per-job latency of a fresh interpreter (cold) against the
+    running service (warm). Returns (cold_mean, warm_mean) in seconds.
+    """
+    code = ("import json, sys; from slicing_service import run_job_inline; "
+            "run_job_inline('cold', sys.argv[1], json.loads(sys.argv[2]))")
+    cold = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code, job_type, json.dumps(params)],
+                       cwd=BASE_DIR, check=True, capture_output=True)
+        cold.append(time.perf_counter() - start)
+
+    warm = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_job(job_type, params, host=host, port=port)
+        warm.append(time.perf_counter() - start)
+
+    cold_mean, warm_mean = sum(cold) / runs, sum(warm) / runs
+    print(f"{job_type}: cold {cold_mean:.2f} s, warm {warm_mean:.2f} s per job "
+          f"({cold_mean / warm_mean:.1f}x faster warm)")
+    return cold_mean, warm_mean
+
+
+if __name__ == "__main__":
+    usage = ("Usage: python slicing_service.py serve [workers]\n"
+             "       python slicing_service.py submit <slice|convert|analyze> <params.json>\n"
+             "       python slicing_service.py latency <slice|convert|analyze> <params.json> [runs]")
+    if len(sys.argv) < 2 or sys.argv[1] not in ("serve", "submit", "latency"):
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "serve":
+        serve(workers=int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WORKERS)
+    else:
+        if len(sys.argv) < 4:
+            print(usage)
+            sys.exit(1)
+        with open(sys.argv[3], 'r') as f:
+            job_params = json.load(f)
+        if sys.argv[1] == "submit":
+            result = run_job(sys.argv[2], job_params, on_progress=lambda stage: print(f" {stage}..."))
+            print(json.dumps(result, indent=4))
+        else:
+            measure_latency(sys.argv[2], job_params, int(sys.argv[4]) if len(sys.argv) > 4 else 3)
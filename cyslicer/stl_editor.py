@@ -6,13 +6,27 @@ from pathlib import Path
 import json
 
 
+def _rotation_matrix(axis, angle):
+    # Homogeneous rotation of angle degrees about a unit axis through the origin
+    x, y, z = axis
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    m = np.eye(4)
+    m[:3, :3] = [
+        [c + x * x * (1 - c), x * y * (1 - c) - z * s, x * z * (1 - c) + y * s],
+        [y * x * (1 - c) + z * s, c + y * y * (1 - c), y * z * (1 - c) - x * s],
+        [z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, c + z * z * (1 - c)],
+    ]
+    return m
+
+
 class STLEditor(QtWidgets.QMainWindow):
-    def __init__(self, stl_path, callback_on_save=None):
+    def __init__(self, stl_path, callback_on_save=None, publisher=None):
         super().__init__()
         self.setWindowTitle("STL Editor")
 
         self.original_path = Path(stl_path)
         self.callback_on_save = callback_on_save
+        self.publisher = publisher
 
         self.mesh = pv.read(str(self.original_path))
         if self.mesh.n_points == 0:
@@ -21,6 +35,10 @@ class STLEditor(QtWidgets.QMainWindow):
         center = np.array(self.mesh.center)
         self.mesh.translate(-center, inplace=True)
         self.transformed_mesh = self.mesh.copy()
+        # Accumulated transform from the file on disk to transformed_mesh
+        self.base_transform = np.eye(4)
+        self.base_transform[:3, 3] = -center
+        self.transform = self.base_transform.copy()
 
         # === Main widget layout ===
         central_widget = QtWidgets.QWidget()
@@ -75,6 +93,8 @@ class STLEditor(QtWidgets.QMainWindow):
         # --- Other controls ---
         layout.addWidget(self._btn("Reset", self.reset_transform))
         layout.addWidget(self._btn("Save STL", self.save_stl))
+        if self.publisher:
+            layout.addWidget(self._btn("Send to Slicer", self.send_to_slicer))
 
         layout.addStretch()
         return layout
@@ -87,11 +107,15 @@ class STLEditor(QtWidgets.QMainWindow):
     def apply_scale(self):
         factors = [self.sx.value(), self.sy.value(), self.sz.value()]
         self.transformed_mesh.scale(factors, inplace=True)
+        self.transform = np.diag(factors + [1.0]) @ self.transform
         self.update_view()
 
     def apply_translation(self):
         vec = [self.tx.value(), self.ty.value(), self.tz.value()]
         self.transformed_mesh.translate(vec, inplace=True)
+        step = np.eye(4)
+        step[:3, 3] = vec
+        self.transform = step @ self.transform
         self.update_view()
 
     def apply_rotation(self):
@@ -99,10 +123,12 @@ class STLEditor(QtWidgets.QMainWindow):
         angle = self.angle_spin.value()
         vec = {"x": [1, 0, 0], "y": [0, 1, 0], "z": [0, 0, 1]}[axis]
         self.transformed_mesh.rotate_vector(vec, angle, point=(0, 0, 0), inplace=True)
+        self.transform = _rotation_matrix(vec, angle) @ self.transform
         self.update_view()
 
     def reset_transform(self):
         self.transformed_mesh = self.mesh.copy()
+        self.transform = self.base_transform.copy()
         self.update_view()
 
     def update_view(self):
@@ -126,7 +152,23 @@ class STLEditor(QtWidgets.QMainWindow):
             self.transformed_mesh.save(save_path)
             self.update_json_and_notify(Path(save_path))
 
+    def send_to_slicer(self):
+        # Hand the edited mesh to the GUI through shared memory, no STL round trip
+        tri = self.transformed_mesh.triangulate()
+        faces = tri.faces.reshape(-1, 4)[:, 1:]
+        try:
+            self.publisher.publish(tri.points, faces, self.transform, source=str(self.original_path))
+        except (TimeoutError, RuntimeError, OSError) as e:
+            QtWidgets.QMessageBox.warning(self, "Send to Slicer", f"The mesh was not sent:\n{e}")
+
     def update_json_and_notify(self, new_stl_path):
+        if self.publisher:
+            # The GUI owns user_parameters.json; let it update the path itself
+            self.publisher.send_path(new_stl_path)
+            if self.callback_on_save:
+                self.callback_on_save(str(new_stl_path))
+            return
+
         json_path = Path(__file__).parent / "user_parameters.json"
         if json_path.exists():
             with open(json_path) as f:
@@ -1,13 +1,18 @@
 import sys
 from PyQt5.QtWidgets import QApplication
 from stl_editor import STLEditor
+from mesh_ipc import MeshPublisher
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python -m stl_editor_launcher <stl_file>")
+        print("Usage: python -m stl_editor_launcher <stl_file> [--channel host:port:key]")
         sys.exit(1)
 
     stl_path = sys.argv[1]
+    publisher = None
+    if "--channel" in sys.argv[2:-1]:
+        publisher = MeshPublisher(sys.argv[sys.argv.index("--channel") + 1])
+
     app = QApplication(sys.argv)
-    editor = STLEditor(stl_path)
+    editor = STLEditor(stl_path, publisher=publisher)
     sys.exit(app.exec_())
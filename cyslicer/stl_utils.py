@@ -8,6 +8,8 @@ from trimesh import boolean
 from pathlib import Path
 from pymeshfix import MeshFix
 
+import instrumentation
+
 
 def crop_stl_with_cube(input_path, output_path, debug_temp_path=None):
     """
@@ -74,50 +76,64 @@ def calculate_normal(v0, v1, v2):
 
 
 
-def unwrap_and_repair_stl(input_path, output_path, debug_temp_path: Path = None):
-    print(f"Loading and repairing STL: {input_path}")
-    tm = trimesh.load_mesh(str(input_path), force='mesh')
-
-    # Initial check
-    if not tm.is_watertight:
-        print(" Mesh is not watertight. Attempting repair...")
-
-        # Apply all core repairs
-        tm.repair.fix_normals()
-        tm.repair.fill_holes()
-        tm.repair.fix_winding()
-        tm.remove_duplicate_faces()
-        tm.remove_degenerate_faces()
-        tm.remove_unreferenced_vertices()
-        tm.process(validate=True)
-
-        # Check again
-        if tm.is_watertight:
-            print(" Mesh repaired and now watertight.")
-        else:
-            print(" Mesh repaired but still NOT watertight.")
+def unwrap_and_repair_stl(input_path, output_path, debug_temp_path: Path = None, mesh_data=None):
+    """
+    Unwrap and repair an STL. When mesh_data (vertices, faces) is given,
+    for example a mesh received from the STL editor, it is used instead of
+    loading input_path, which then only names the debug output.
+    """
+    if mesh_data is not None:
+        print(f"Repairing in-memory mesh for: {input_path}")
+        tm = trimesh.Trimesh(vertices=mesh_data[0], faces=mesh_data[1], process=True)
+    else:
+        print(f"Loading and repairing STL: {input_path}")
+        tm = trimesh.load_mesh(str(input_path), force='mesh')
+    instrumentation.count("faces_in", len(tm.faces))
+
+    with instrumentation.span("repair", faces=len(tm.faces)):
+        # Initial check
+        if not tm.is_watertight:
+            print(" Mesh is not watertight. Attempting repair...")
+
+            # Apply all core repairs
+            tm.repair.fix_normals()
+            tm.repair.fill_holes()
+            tm.repair.fix_winding()
+            tm.remove_duplicate_faces()
+            tm.remove_degenerate_faces()
+            tm.remove_unreferenced_vertices()
+            tm.process(validate=True)
+
+            # Check again
+            if tm.is_watertight:
+                print(" Mesh repaired and now watertight.")
+            else:
+                print(" Mesh repaired but still NOT watertight.")
 
     if debug_temp_path:
         repaired_temp_path = debug_temp_path / f"repaired_{input_path.name}"
         tm.export(repaired_temp_path)
         print(f" Repaired STL saved to: {repaired_temp_path}")
 
-    # Convert to numpy-stl for unwrapping
-    original_vectors = tm.vertices[tm.faces]
-    valid_triangles = []
+    with instrumentation.span("unwrap", faces=len(tm.faces)):
+        # Convert to numpy-stl for unwrapping
+        original_vectors = tm.vertices[tm.faces]
+        valid_triangles = []
 
-    for triangle in original_vectors:
-        v0, t0 = unwrap_vertex(*triangle[0])
-        v1, t1 = unwrap_vertex(*triangle[1])
-        v2, t2 = unwrap_vertex(*triangle[2])
-        thetas = [t0, t1, t2]
+        for triangle in original_vectors:
+            v0, t0 = unwrap_vertex(*triangle[0])
+            v1, t1 = unwrap_vertex(*triangle[1])
+            v2, t2 = unwrap_vertex(*triangle[2])
+            thetas = [t0, t1, t2]
 
-        # Reject triangles spanning >250 degree
-        if (max(thetas) - min(thetas) )> (250* pi / 180):
-            continue
+            # Reject triangles spanning >250 degree
+            if (max(thetas) - min(thetas) )> (250* pi / 180):
+                continue
 
-        normal = calculate_normal(v0, v1, v2)
-        valid_triangles.append((v0, v1, v2, normal))
+            normal = calculate_normal(v0, v1, v2)
+            valid_triangles.append((v0, v1, v2, normal))
+    instrumentation.count("faces_dropped", len(original_vectors) - len(valid_triangles))
+    instrumentation.count("faces_out", len(valid_triangles))
 
     # Save filtered triangles to STL
     repaired_data = np.zeros(len(valid_triangles), dtype=mesh.Mesh.dtype)
@@ -130,52 +146,55 @@ def unwrap_and_repair_stl(input_path, output_path, debug_temp_path: Path = None)
     repaired_mesh.save(output_path, mode=mesh.stl.Mode.ASCII)
     print(f" Unwrapped and repaired STL saved to: {output_path}")
 
-# Reload and verify final STL
-    print(f" Verifying saved STL: {output_path}")
-    tm_check = trimesh.load_mesh(str(output_path), force='mesh')
-
-    if tm_check.is_watertight:
-        print(" Mesh is already watertight. No changes made.")
-    else:
-        print(" Mesh is not watertight. Attempting repair...")
-        # Perform repairs
-        trimesh.repair.fix_normals(tm_check)
-        trimesh.repair.fill_holes(tm_check)
-        trimesh.repair.fix_winding(tm_check)
-        tm_check.remove_duplicate_faces()
-        tm_check.remove_degenerate_faces()
-        tm_check.remove_unreferenced_vertices()
-        tm_check.process(validate=True)
+    # Reload and verify final STL
+    with instrumentation.span("verify"):
+        print(f" Verifying saved STL: {output_path}")
+        tm_check = trimesh.load_mesh(str(output_path), force='mesh')
 
         if tm_check.is_watertight:
-            print(" Mesh repaired and now watertight. Overwriting file...")
+            print(" Mesh is already watertight. No changes made.")
         else:
-            print(" Repair attempted but mesh is still NOT watertight. Overwriting file anyway to save intermediate state.")
+            print(" Mesh is not watertight. Attempting repair...")
+            # Perform repairs
+            trimesh.repair.fix_normals(tm_check)
+            trimesh.repair.fill_holes(tm_check)
+            trimesh.repair.fix_winding(tm_check)
+            tm_check.remove_duplicate_faces()
+            tm_check.remove_degenerate_faces()
+            tm_check.remove_unreferenced_vertices()
+            tm_check.process(validate=True)
+
+            if tm_check.is_watertight:
+                print(" Mesh repaired and now watertight. Overwriting file...")
+            else:
+                print(" Repair attempted but mesh is still NOT watertight. Overwriting file anyway to save intermediate state.")
 
 
-        if not tm_check.is_watertight:
-            print(" Repair failed. Trying pymeshfix...")
+            if not tm_check.is_watertight:
+                print(" Repair failed. Trying pymeshfix...")
 
-            mf = MeshFix(tm_check.vertices, tm_check.faces)
-            mf.repair(verbose=False, joincomp=True)
+                mf = MeshFix(tm_check.vertices, tm_check.faces)
+                mf.repair(verbose=False, joincomp=True)
 
-            # Rebuild as a proper Trimesh object
-            fixed_mesh = trimesh.Trimesh(vertices=mf.v, faces=mf.f, process=True)
+                # Rebuild as a proper Trimesh object
+                fixed_mesh = trimesh.Trimesh(vertices=mf.v, faces=mf.f, process=True)
 
-            # Optional cleanup
-            components = fixed_mesh.split(only_watertight=False)
-            large_components = [c for c in components if len(c.faces) >= 100]
+                # Optional cleanup
+                components = fixed_mesh.split(only_watertight=False)
+                large_components = [c for c in components if len(c.faces) >= 100]
+                instrumentation.count("components_split", len(components))
+                instrumentation.count("components_dropped", len(components) - len(large_components))
 
-            if not large_components:
-                print("All pymeshfix components were too small. Nothing to save.")
-                return
+                if not large_components:
+                    print("All pymeshfix components were too small. Nothing to save.")
+                    return
 
-            fixed_mesh = trimesh.util.concatenate(large_components)
+                fixed_mesh = trimesh.util.concatenate(large_components)
 
-            if fixed_mesh.is_watertight:
-                print(" pymeshfix succeeded. Mesh is watertight.")
-            else:
-                print("pymeshfix ran but result is still NOT watertight.")
+                if fixed_mesh.is_watertight:
+                    print(" pymeshfix succeeded. Mesh is watertight.")
+                else:
+                    print("pymeshfix ran but result is still NOT watertight.")
 
-            fixed_mesh.export(output_path)
-            print(f" Final mesh saved to: {output_path}")
+                fixed_mesh.export(output_path)
+                print(f" Final mesh saved to: {output_path}")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The modules import each other as top-level names, as when run from cyslicer/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
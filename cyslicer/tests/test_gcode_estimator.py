@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from gcode_estimator import AXES, _parse_chunk, estimate_print
+
+
+def _write(tmp_path, lines):
+    path = tmp_path / "part.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_retract_and_unretract_use_no_filament(tmp_path):
+    path = _write(tmp_path, [
+        "G90", "M82", "G92 E0",
+        ";LAYER_CHANGE",
+        "G1 X10 Y0 E2.5 F1800",
+        "G1 E1.5 F2100",            # retract 1 mm
+        "G1 X20 Y0 F6000",
+        "G1 E2.5 F2100",            # unretract
+        ";LAYER_CHANGE",
+        "G1 X30 Y0 E5.0 F1800",
+    ])
+    estimate = estimate_print(path)
+    assert estimate["filament_mm"] == pytest.approx(5.0)
+    assert list(estimate["layer_filament"]) == pytest.approx([0.0, 2.5, 2.5])
+
+
+def test_relative_extrusion_with_retracts(tmp_path):
+    path = _write(tmp_path, [
+        "G90", "M83",
+        "G1 X10 Y0 E3 F1800",
+        "G1 E-0.8 F2100",
+        "G1 E0.8",
+        "G1 X20 Y0 E2 F1800",
+        "G92 E0",
+        "G1 E-0.8",
+        "G1 E0.8",
+    ])
+    assert estimate_print(path)["filament_mm"] == pytest.approx(5.0)
+
+
+@pytest.mark.parametrize("word", ["0", "-0", "12", "+3.5", "-.25", "7.", "359.99100", "0.30000000000000004",
+                                  "123456.789012345", "1234567890.1234567", "1e3", "-", ".", "1.2.3", "abc", ""])
+def test_parse_chunk_reads_numbers_like_float(word):
+    cmd, values, layer_marks = _parse_chunk(f"G1 Y{word} E1;E9\n;LAYER_CHANGE\n".encode())
+    try:
+        expected = float(word)
+    except ValueError:
+        expected = np.nan
+    assert list(cmd[:2]) == [1, -1]
+    np.testing.assert_array_equal(values[0, AXES.index("Y")], expected)
+    assert values[0, AXES.index("E")] == 1
+    assert list(layer_marks[:2]) == [0, 1]
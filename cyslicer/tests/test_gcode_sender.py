@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from gcode_sender import GcodeSender
+from virtual_printer import VirtualPrinter
+
+COMMANDS = [f"G1 X{i % 50}.000 Y{i % 7}.000 E{i * 0.01:.3f}" for i in range(600)]
+
+
+async def _stream(printer, rx_buffer, ok_timeout=2.0):
+    async def client(reader, writer):
+        await printer.handle(reader.read, writer.write)
+        writer.close()
+
+    server = await asyncio.start_server(client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            sender = GcodeSender(reader, writer, rx_buffer=rx_buffer, ok_timeout=ok_timeout)
+            return await asyncio.wait_for(sender.send(COMMANDS), 60)
+        finally:
+            writer.close()
+
+
+@pytest.mark.parametrize("rx_buffer", [128, None])
+@pytest.mark.parametrize("seed", range(4))
+def test_stream_with_errors(seed, rx_buffer):
+    printer = VirtualPrinter(ok_latency=0.0005, move_time=0.0, error_rate=0.05, seed=seed)
+    stats = asyncio.run(_stream(printer, rx_buffer))
+
+    assert stats["lines"] == len(COMMANDS)
+    assert stats["resends"] > 0
+    assert stats["timeouts"] == 0
+    assert printer.stats["lines"] == len(COMMANDS)
+    assert printer.stats["overflow_bytes"] == 0
+
+
+def test_lost_ok_is_replayed():
+    printer = VirtualPrinter(ok_latency=0.0005, move_time=0.0, seed=0)
+    oks = []
+    dropped = []
+    original = printer.handle
+
+    async def handle(reader, send):
+        def lossy_send(data):
+            # Swallow the 100th ok
+            if data == b"ok\n":
+                oks.append(data)
+                if len(oks) == 100:
+                    dropped.append(data)
+                    return
+            send(data)
+        await original(reader, lossy_send)
+
+    printer.handle = handle
+    stats = asyncio.run(_stream(printer, 128, ok_timeout=0.2))
+
+    assert dropped
+    assert stats["timeouts"] >= 1
+    assert printer.stats["lines"] == len(COMMANDS)
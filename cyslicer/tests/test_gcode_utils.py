@@ -0,0 +1,66 @@
+import math
+import re
+
+import pytest
+
+from benchmark_data import write_cylindrical_gcode
+from gcode_utils import compact_gcode, compare_toolpaths, modify_gcode
+
+
+def _write_wavy(path, moves=3000):
+    # Finely sampled sine wave along Y while B turns: merges must stop at the bends
+    with open(path, 'w') as f:
+        f.write("G0 X0 Y0 Z17.000\nM82\nG92 E0\n;LAYER_CHANGE\nG1 F720 Z17.20000\nG1 F1800\n")
+        e, y = 0.0, 0.0
+        for i in range(1, moves + 1):
+            # Constant flow, so only the geometry limits merging
+            new_y = 2 * math.sin(i * 0.02)
+            e += 0.05 * math.hypot(math.radians(0.05) * 17.0, new_y - y)
+            y = new_y
+            f.write(f"G1 B{i * 0.05:.5f} Y{y:.5f} E{e:.5f}\n")
+    return path
+
+
+@pytest.mark.parametrize("tolerance", [0.01, 0.05])
+@pytest.mark.parametrize("make", [write_cylindrical_gcode, _write_wavy], ids=["helical", "wavy"])
+def test_compacted_toolpath_stays_within_tolerance(tmp_path, make, tolerance):
+    original = make(tmp_path / "original.gcode", 3000)
+    compacted = tmp_path / "compacted.gcode"
+    stats = compact_gcode(original, compacted, tolerance=tolerance)
+
+    assert stats["moves_out"] < stats["moves_in"]
+    assert compare_toolpaths(original, compacted, spacing=0.05) <= tolerance
+
+
+def test_feed_compensation_uses_machine_z(tmp_path):
+    planar = tmp_path / "planar.gcode"
+    planar.write_text("\n".join([
+        "G28 ; home all axes",
+        "G1 Z5 F5000 ; lift nozzle",
+        "M109 S220 ; Wait for Hotend Temperature",
+        "M82", "G92 E0",
+        ";LAYER_CHANGE",
+        "G1 X0 Y0 F1800",
+        "G1 X20 Y0 Z.2 E1",          # ramps down from the lift while turning B
+        "G1 X30 Y5 E2",
+    ]) + "\n")
+    converted = tmp_path / "converted.gcode"
+    modify_gcode(planar, converted, radius=17.0)
+
+    # Check every compensated feed against the B/Y/Z the machine is actually sent
+    b = y = 0.0
+    z = None
+    checked = 0
+    for line in converted.read_text().splitlines():
+        words = dict(re.findall(r'([BYZF])([-+]?[0-9]*\.?[0-9]+)', line.split(';')[0]))
+        if not line.startswith(("G0", "G1")):
+            continue
+        new_b, new_y, new_z = (float(words.get(k, v)) for k, v in (("B", b), ("Y", y), ("Z", z or 0.0)))
+        if "B" in words and new_b != b:
+            d_b, d_y, d_z = new_b - b, new_y - y, new_z - z
+            commanded = math.sqrt(d_b ** 2 + d_y ** 2 + d_z ** 2)
+            surface = math.sqrt((math.radians(d_b) * z) ** 2 + d_y ** 2 + d_z ** 2)
+            assert float(words["F"]) == pytest.approx(1800 * commanded / surface, rel=1e-3)
+            checked += 1
+        b, y, z = new_b, new_y, new_z
+    assert checked == 2
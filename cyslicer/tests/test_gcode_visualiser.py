@@ -0,0 +1,47 @@
+import math
+
+import numpy as np
+import pytest
+
+from gcode_visualiser import parse_cylindrical_gcode, CHORD_TOLERANCE, COARSE_CHORD_TOLERANCE
+
+CONSTANT_RADIUS = ["G1 Z20 F720", "G1 B90 E1 F1800", "G1 B-270 E2", "G1 B-269.5 E2.1", "G1 Y5 B30 E3"]
+VARYING_RADIUS = ["G1 Z20 F720", "G1 B180 Z40 E1 F1800", "G1 B-90 Z17.2 Y3 E2", "G1 B270 Z1 E3", "G1 B0 Z60"]
+
+
+def _max_deviation(moves, samples=101):
+    """Largest distance between a chord and the spiral arc it stands for."""
+    worst = 0.0
+    for start, end, _ in moves:
+        a, b = np.array(start), np.array(end)
+        r0, r1 = math.hypot(a[0], a[2]), math.hypot(b[0], b[2])
+        t0 = math.atan2(a[2], a[0])
+        d = (math.atan2(b[2], b[0]) - t0 + math.pi) % (2 * math.pi) - math.pi   # chords never span half a turn
+        t = np.linspace(0.0, 1.0, samples)
+        r, theta = r0 + (r1 - r0) * t, t0 + d * t
+        arc = np.column_stack((r * np.cos(theta), a[1] + (b[1] - a[1]) * t, r * np.sin(theta)))
+        chord = b - a
+        s = np.clip((arc - a) @ chord / max(chord @ chord, 1e-12), 0.0, 1.0)
+        worst = max(worst, float(np.linalg.norm(arc - (a + s[:, None] * chord), axis=1).max()))
+    return worst
+
+
+@pytest.mark.parametrize("lines", [CONSTANT_RADIUS, VARYING_RADIUS], ids=["constant", "varying"])
+@pytest.mark.parametrize("tolerance, coarse", [(None, False), (None, True), (0.001, False)],
+                         ids=["default", "coarse", "tight"])
+def test_chords_stay_within_tolerance(tmp_path, lines, tolerance, coarse):
+    path = tmp_path / "moves.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    moves = parse_cylindrical_gcode(path, tolerance=tolerance, coarse=coarse)
+    limit = tolerance or (COARSE_CHORD_TOLERANCE if coarse else CHORD_TOLERANCE)
+
+    deviation = _max_deviation(moves)
+    assert deviation <= limit * (1 + 1e-6)
+    assert deviation > limit / 10    # the moves are long enough to need real subdivision
+
+
+def test_tighter_tolerance_uses_more_segments(tmp_path):
+    path = tmp_path / "moves.gcode"
+    path.write_text("\n".join(CONSTANT_RADIUS) + "\n")
+    counts = [len(parse_cylindrical_gcode(path, tolerance=t)) for t in (0.5, 0.02, 0.001)]
+    assert counts[0] < counts[1] < counts[2]
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmark_data import write_planar_gcode
+
+CYSLICER_DIR = Path(__file__).resolve().parent.parent
+
+
+def _run(args, **env):
+    env = dict(os.environ, PYTHONPATH=str(CYSLICER_DIR), **env)
+    env.pop("CYSLICER_TRACE_OWNER", None)
+    subprocess.run([sys.executable] + args, cwd=CYSLICER_DIR, env=env, check=True, timeout=120)
+
+
+def test_service_workers_write_their_own_reports(tmp_path):
+    planar = write_planar_gcode(tmp_path / "planar.gcode", lines=2000)
+    params = {"input": str(planar), "output": str(tmp_path / "out.gcode"), "bed_radius": 17.0}
+    code = ("from slicing_service import SlicingService\n"
+            "service = SlicingService(workers=1)\n"
+            f"job = service.wait_for_change(service.submit('convert', {params!r}), 10 ** 6, timeout=60)\n"
+            "assert job['status'] == 'done', job\n")
+    _run(["-c", code], CYSLICER_TRACE=str(tmp_path / "trc"))
+
+    worker_reports = [p for p in tmp_path.glob("trc.*.json") if not p.name.endswith(".trace.json")]
+    assert (tmp_path / "trc.json").exists()
+    assert len(worker_reports) == 1
+    report = json.loads(worker_reports[0].read_text())
+    assert [span["name"] for span in report["spans"]] == ["modify_gcode"]
+    assert report["counters"]["gcode_lines_in"] > 0
+
+
+def test_spawned_child_does_not_take_over_owner_report(tmp_path):
+    # A spawned child re-imports instrumentation and runs enable() from the environment
+    code = ("import multiprocessing, instrumentation\n"
+            "def child():\n"
+            "    instrumentation.count('child')\n"
+            "    instrumentation.write_reports()\n"
+            "if __name__ == '__main__':\n"
+            "    instrumentation.count('owner')\n"
+            "    p = multiprocessing.get_context('spawn').Process(target=child)\n"
+            "    p.start(); p.join()\n")
+    script = tmp_path / "spawn_check.py"
+    script.write_text(code)
+    _run([str(script)], CYSLICER_TRACE=str(tmp_path / "trc"))
+
+    owner = json.loads((tmp_path / "trc.json").read_text())
+    assert owner["counters"] == {"owner": 1}
+    children = [p for p in tmp_path.glob("trc.*.json") if not p.name.endswith(".trace.json")]
+    assert [json.loads(p.read_text())["counters"] for p in children] == [{"child": 1}]
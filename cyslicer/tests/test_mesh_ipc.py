@@ -0,0 +1,80 @@
+import threading
+from multiprocessing.connection import Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+import mesh_ipc
+from mesh_ipc import MeshListener, MeshPublisher
+
+
+def _mesh(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(50, 3)), rng.integers(0, 50, size=(80, 3))
+
+
+def _assert_unlinked(name):
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+
+def test_publish_round_trip_and_unlink():
+    listener = MeshListener()
+    publisher = MeshPublisher(listener.argument)
+    try:
+        vertices, faces = _mesh()
+        publisher.publish(vertices, faces, np.eye(4), source="part.stl")
+        [message] = listener.poll()
+        np.testing.assert_array_equal(message["vertices"], vertices)
+        np.testing.assert_array_equal(message["faces"], faces)
+        assert message["transform"] == np.eye(4).tolist()
+        assert message["source"] == "part.stl"
+        _assert_unlinked(message["shm"])
+    finally:
+        publisher.close()
+        listener.close()
+
+
+def test_unreadable_mesh_is_refused_and_channel_survives(monkeypatch):
+    listener = MeshListener()
+    publisher = MeshPublisher(listener.argument)
+    try:
+        real_read_mesh = mesh_ipc.read_mesh
+
+        def gone(message):
+            raise FileNotFoundError(message["shm"])
+
+        monkeypatch.setattr(mesh_ipc, "read_mesh", gone)
+        with pytest.raises(RuntimeError):
+            publisher.publish(*_mesh(), np.eye(4))
+        assert listener.poll() == []
+
+        monkeypatch.setattr(mesh_ipc, "read_mesh", real_read_mesh)
+        vertices, faces = _mesh(1)
+        publisher.publish(vertices, faces, np.eye(4))
+        [message] = listener.poll()
+        np.testing.assert_array_equal(message["vertices"], vertices)
+    finally:
+        publisher.close()
+        listener.close()
+
+
+def test_publish_times_out_without_ack(monkeypatch):
+    monkeypatch.setattr(mesh_ipc, "ACK_TIMEOUT", 0.2)
+    silent = Listener(("127.0.0.1", 0), authkey=b"key")
+    host, port = silent.address
+    connections = []
+    accepted = threading.Thread(target=lambda: connections.append(silent.accept()))
+    accepted.start()
+    publisher = MeshPublisher(f"{host}:{port}:{b'key'.hex()}")
+    try:
+        with pytest.raises(TimeoutError):
+            publisher.publish(*_mesh(), np.eye(4))
+        accepted.join()
+        _assert_unlinked(connections[0].recv()["shm"])
+    finally:
+        publisher.close()
+        for conn in connections:
+            conn.close()
+        silent.close()
@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+import pytest
+import trimesh
+
+import benchmark_data
+from plate_utils import angular_extent, pack_parts
+
+RADIUS = 17.0
+
+
+def _part(width, depth, angle, y=0.0):
+    # A block of the given arc width (mm) and Y depth sitting on the cylinder at angle
+    part = trimesh.creation.box(extents=(width, depth, 3.0))
+    part.apply_translation((0.0, y + depth / 2, RADIUS + 1.5))
+    part.apply_transform(trimesh.transformations.rotation_matrix(angle, [0, 1, 0]))
+    return part
+
+
+def _placed_footprints(meshes, placements):
+    footprints = []
+    for m, (rotation, y_shift) in zip(meshes, placements):
+        vertices = m.vertices @ trimesh.transformations.rotation_matrix(rotation, [0, 1, 0])[:3, :3].T
+        start, span = angular_extent(vertices)
+        footprints.append((start, span, vertices[:, 1].min() + y_shift, vertices[:, 1].max() + y_shift))
+    return footprints
+
+
+@pytest.mark.parametrize("count", [3, 12])
+def test_packed_parts_do_not_overlap(count):
+    rng = np.random.default_rng(count)
+    meshes = [_part(rng.uniform(4, 15), rng.uniform(3, 12), rng.uniform(0, 2 * math.pi), rng.uniform(-5, 5))
+              for _ in range(count)]
+    footprints = _placed_footprints(meshes, pack_parts(meshes, RADIUS, gap=2.0))
+
+    for start, span, _, _ in footprints:
+        assert 0 < start and start + span < 2 * math.pi
+    for i, (start_a, span_a, low_a, high_a) in enumerate(footprints):
+        for start_b, span_b, low_b, high_b in footprints[i + 1:]:
+            apart_in_theta = start_a + span_a <= start_b or start_b + span_b <= start_a
+            apart_in_y = high_a <= low_b or high_b <= low_a
+            assert apart_in_theta or apart_in_y
+
+
+def test_part_around_the_whole_cylinder_is_rejected():
+    vertices, faces = benchmark_data.ring_mesh(400, radius=RADIUS)
+    ring = trimesh.Trimesh(vertices, faces)
+    with pytest.raises(ValueError):
+        pack_parts([_part(5, 5, 0.0), ring], RADIUS)
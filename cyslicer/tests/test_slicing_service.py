@@ -0,0 +1,108 @@
+import json
+import os
+import signal
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import slicing_service
+from benchmark_data import write_planar_gcode
+from slicing_service import SlicingService, make_server, run_job
+
+
+def _wait(service, job_id):
+    # Returns as soon as the job finishes, or after the timeout with it still pending
+    return service.wait_for_change(job_id, seen=10 ** 6, timeout=60)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs SIGKILL")
+def test_service_survives_worker_crash(tmp_path):
+    planar = write_planar_gcode(tmp_path / "planar.gcode", lines=2000)
+    params = {"input": str(planar), "output": str(tmp_path / "out.gcode"), "bed_radius": 17.0}
+    service = SlicingService(workers=1)
+    try:
+        assert _wait(service, service.submit("convert", params))["status"] == "done"
+
+        for process in list(service._pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        assert _wait(service, service.submit("convert", params))["status"] == "failed"
+
+        job = _wait(service, service.submit("convert", params))
+        assert job["status"] == "done", job["error"]
+    finally:
+        service.close()
+
+
+def _status(port, path, body=None, headers=None):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=body, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_http_requires_session_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(slicing_service, "SESSION_FILE", tmp_path / "service.json")
+    service = SlicingService(workers=1)
+    server = make_server(service, port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        token = json.loads((tmp_path / "service.json").read_text())["token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        planar = write_planar_gcode(tmp_path / "planar.gcode", lines=500)
+        job = json.dumps({"type": "convert", "params": {"input": str(planar), "output": str(tmp_path / "out.gcode"),
+                                                       "bed_radius": 17.0}}).encode()
+
+        # A web page can send a simple text/plain POST but has no token
+        assert _status(port, "/jobs", job, {"Content-Type": "text/plain"}) == 403
+        assert _status(port, "/health") == 403
+        assert _status(port, "/jobs", job, dict(auth, **{"Content-Type": "text/plain"})) == 415
+        assert _status(port, "/jobs", job, dict(auth, **{"Content-Type": "application/json",
+                                                           "Origin": "http://example.com"})) == 403
+        assert _status(port, "/health", headers=auth) == 200
+
+        assert run_job("convert", json.loads(job)["params"], port=port) == {"gcode": str(tmp_path / "out.gcode")}
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_bad_priority_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(slicing_service, "SESSION_FILE", tmp_path / "service.json")
+    service = SlicingService(workers=1)
+    server = make_server(service, port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        token = json.loads((tmp_path / "service.json").read_text())["token"]
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        planar = write_planar_gcode(tmp_path / "planar.gcode", lines=500)
+        params = {"input": str(planar), "output": str(tmp_path / "out.gcode"), "bed_radius": 17.0}
+        for priority in ("high", True, [1]):
+            body = json.dumps({"type": "convert", "params": params, "priority": priority}).encode()
+            assert _status(port, "/jobs", body, headers) == 400
+        assert service.jobs == {}
+
+        # A string in the heap would make every later submit fail to compare
+        first = service.submit("convert", params, priority=5)
+        second = service.submit("convert", params, priority=0.5)
+        assert _wait(service, first)["status"] == "done"
+        assert _wait(service, second)["status"] == "done"
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_close_stops_workers_and_threads():
+    service = SlicingService(workers=2)
+    processes = list(service._pool._processes.values())
+    service.close()
+    assert all(not thread.is_alive() for thread in service._threads)
+    assert all(not process.is_alive() for process in processes)
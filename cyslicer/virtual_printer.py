@@ -0,0 +1,164 @@
+import asyncio
+import os
+import random
+import re
+import sys
+
+from gcode_sender import checksum
+
+# Defaults roughly matching a Marlin board on USB
+RX_BUFFER_SIZE = 128
+PLANNER_SIZE = 16
+OK_LATENCY = 0.002          # s between handling a line and its ok reaching the host
+MOVE_TIME = 0.002           # s the planner spends per queued move
+DEFAULT_PORT = 8250
+
+line_re = re.compile(r'^N(\d+)\s+(.*)\*(\d+)$')
+
+
+class VirtualPrinter:
+    """
+    Stand-in for a printer's serial side, for testing senders without hardware.
+
+    Incoming bytes land in a receive buffer of rx_buffer bytes; anything
+    beyond it is dropped as a real UART would. Lines are checked for line
+    number and checksum, and a mismatch asks for a resend. Moves wait for
+    room in a planner queue that drains one move every move_time seconds,
+    and every reply reaches the host ok_latency seconds after it is sent.
+    error_rate corrupts that fraction of received lines to exercise resends.
+    """
+
+    def __init__(self, rx_buffer=RX_BUFFER_SIZE, planner_size=PLANNER_SIZE, ok_latency=OK_LATENCY,
+                 move_time=MOVE_TIME, error_rate=0.0, seed=None):
+        self.rx_buffer = rx_buffer
+        self.planner_size = planner_size
+        self.ok_latency = ok_latency
+        self.move_time = move_time
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats = {"lines": 0, "moves": 0, "overflow_bytes": 0, "resends": 0}
+
+    async def handle(self, reader, send):
+        loop = asyncio.get_running_loop()
+
+        def write(data):
+            # Replies are delayed, not the firmware, so lines keep being processed
+            loop.call_later(self.ok_latency, send, data)
+
+        rx = bytearray()
+        data_ready = asyncio.Event()
+        planner = asyncio.Queue(self.planner_size)
+        expected = 0
+        waiting_resend = False
+
+        async def receive():
+            while True:
+                chunk = await reader(4096)
+                if not chunk:
+                    data_ready.set()
+                    return
+                room = self.rx_buffer - len(rx)
+                self.stats["overflow_bytes"] += max(0, len(chunk) - room)
+                rx.extend(chunk[:max(room, 0)])
+                data_ready.set()
+
+        async def run_planner():
+            while True:
+                await planner.get()
+                await asyncio.sleep(self.move_time)
+                self.stats["moves"] += 1
+
+        tasks = [asyncio.create_task(receive()), asyncio.create_task(run_planner())]
+        write(b"start\n")
+        try:
+            while True:
+                while b"\n" not in rx:
+                    if tasks[0].done():
+                        return
+                    data_ready.clear()
+                    await data_ready.wait()
+                end = rx.index(b"\n")
+                raw = bytes(rx[:end]).decode(errors="replace").strip()
+                del rx[:end + 1]
+                if not raw:
+                    continue
+                if self.error_rate and self.random.random() < self.error_rate:
+                    raw = raw[:-1] + ("0" if raw[-1] != "0" else "1")
+
+                match = line_re.match(raw)
+                valid = match and checksum(raw[:raw.rindex("*")]) == int(match.group(3))
+                n = int(match.group(1)) if match else -1
+                command = match.group(2) if match else raw
+                if valid and command.startswith("M110"):
+                    expected = n + 1
+                    waiting_resend = False
+                    write(b"ok\n")
+                    continue
+                if not valid or n != expected:
+                    if waiting_resend and match and n != expected:
+                        # Like Marlin, lines after a bad one are discarded until the resend arrives
+                        continue
+                    # A bad copy of the awaited line asks again, otherwise the host would wait forever
+                    waiting_resend = True
+                    self.stats["resends"] += 1
+                    # Marlin flushes the receive buffer along with the resend request
+                    rx.clear()
+                    write(f"Error:checksum mismatch, Last Line: {expected - 1}\nResend: {expected}\nok\n".encode())
+                    continue
+
+                waiting_resend = False
+                expected += 1
+                self.stats["lines"] += 1
+                if command.startswith(("G0", "G1")):
+                    await planner.put(command)
+                write(b"ok\n")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def serve_tcp(self, host="127.0.0.1", port=DEFAULT_PORT):
+        async def client(reader, writer):
+            await self.handle(reader.read, writer.write)
+            writer.close()
+
+        server = await asyncio.start_server(client, host, port)
+        print(f"Virtual printer listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def serve_pty(self):
+        """Expose the printer on a pseudo-terminal and print its device path."""
+        import tty
+        master, slave = os.openpty()
+        tty.setraw(master)
+        print(f"Virtual printer on {os.ttyname(slave)}")
+        loop = asyncio.get_running_loop()
+
+        async def read(size):
+            ready = loop.create_future()
+            loop.add_reader(master, ready.set_result, None)
+            try:
+                await ready
+            finally:
+                loop.remove_reader(master)
+            return os.read(master, size)
+
+        def write(data):
+            os.write(master, data)
+
+        while True:
+            await self.handle(read, write)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    printer = VirtualPrinter(
+        rx_buffer=int(args[args.index("--buffer") + 1]) if "--buffer" in args else RX_BUFFER_SIZE,
+        ok_latency=float(args[args.index("--latency") + 1]) if "--latency" in args else OK_LATENCY,
+        error_rate=float(args[args.index("--errors") + 1]) if "--errors" in args else 0.0,
+    )
+    if "--pty" in args:
+        asyncio.run(printer.serve_pty())
+    else:
+        port = int(args[args.index("--port") + 1]) if "--port" in args else DEFAULT_PORT
+        asyncio.run(printer.serve_tcp(port=port))